@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Scanner Benchmark Suite
+
+Runs inventory-esoteric.py and validate-esoteric.py (dry-run and --fix)
+against synthetic libraries from generate-synthetic-library.py, records wall
+time, filesystem call counts and peak memory, and compares the results with
+stored baselines to catch regressions.
+
+Usage:
+    python benchmark-scanners.py                             # 100 and 2000 albums
+    python benchmark-scanners.py --sizes 100 2000 50000      # Larger trees
+    python benchmark-scanners.py --update-baseline           # Store new baselines
+    python benchmark-scanners.py --cases inventory --repeat 5
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+from datetime import datetime
+from typing import Optional
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+GENERATOR = SCRIPTS_DIR / "generate-synthetic-library.py"
+INVENTORY = SCRIPTS_DIR / "inventory-esoteric.py"
+VALIDATOR = SCRIPTS_DIR / "validate-esoteric.py"
+
+DEFAULT_SIZES = [100, 2000]
+DEFAULT_BASELINE = SCRIPTS_DIR / "benchmark-baselines.json"
+CASES = ["inventory", "validate_dry_run", "validate_fix"]
+
+# Allowed growth over baseline before a run counts as a regression.
+# Call counts are deterministic for a given seed, wall time is not.
+DEFAULT_TIME_TOLERANCE = 0.25
+DEFAULT_CALLS_TOLERANCE = 0.05
+DEFAULT_MEMORY_TOLERANCE = 0.25
+
+METRICS = ["wall_seconds", "readdir", "stat", "open", "peak_rss_bytes"]
+# Call counts depend on the generated tree (seed) and on pathlib internals (Python version)
+CALL_METRICS = {"readdir", "stat", "open"}
+
+
+def parse_textfile(path: Path) -> dict:
+    """Read fs call counts from a run_metrics Prometheus textfile"""
+    counts = {}
+    with open(path) as f:
+        for line in f:
+            if line.startswith("music_library_fs_calls{"):
+                call = line.split('call="')[1].split('"')[0]
+                counts[call] = int(float(line.rsplit(" ", 1)[1]))
+    return counts
+
+
+def run_measured(cmd: list) -> dict:
+    """Run a command and return wall time and peak RSS of that child only"""
+    # stderr goes to a file, not a pipe: a child filling the pipe buffer
+    # would block forever while we sit in wait4
+    with tempfile.TemporaryFile() as err:
+        start = time.perf_counter()
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=err)
+        # wait4 gives the rusage of this child rather than all children so far
+        _, status, rusage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - start
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        err.seek(0)
+        stderr = err.read().decode(errors="replace")
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    peak = rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+    return {"returncode": proc.returncode, "wall_seconds": wall, "peak_rss_bytes": peak, "stderr": stderr}
+
+
+class ScannerBenchmark:
+    def __init__(self, work_dir: str, sizes: list, cases: list, repeat: int = 3, seed: int = 0,
+                 time_tolerance: float = DEFAULT_TIME_TOLERANCE,
+                 calls_tolerance: float = DEFAULT_CALLS_TOLERANCE,
+                 memory_tolerance: float = DEFAULT_MEMORY_TOLERANCE):
+        self.work_dir = Path(work_dir)
+        self.sizes = sizes
+        self.cases = cases
+        self.repeat = repeat
+        self.seed = seed
+        self.generated = set()
+        self.tolerances = {
+            "wall_seconds": time_tolerance,
+            "readdir": calls_tolerance,
+            "stat": calls_tolerance,
+            "open": calls_tolerance,
+            "peak_rss_bytes": memory_tolerance,
+        }
+
+        self.report = {
+            "generated": datetime.now().isoformat(),
+            "host": socket.gethostname(),
+            "python": sys.version.split()[0],
+            "seed": seed,
+            "repeat": repeat,
+            "results": {},
+            "regressions": [],
+            "summary": {
+                "cases_run": 0,
+                "cases_failed": 0,
+                "regressions": 0,
+                "improvements": 0,
+            }
+        }
+
+    def generate(self, size: int, name: str) -> Path:
+        """Generate (or regenerate) a synthetic tree for one size"""
+        tree = self.work_dir / name
+        if tree.exists():
+            shutil.rmtree(tree)
+        self.generated.add(tree)
+        subprocess.run([sys.executable, str(GENERATOR), "--albums", str(size), "--output", str(tree),
+                        "--seed", str(self.seed)], check=True, stdout=subprocess.DEVNULL)
+        return tree
+
+    def cleanup(self):
+        """Remove only the trees this run generated"""
+        for tree in self.generated:
+            shutil.rmtree(tree, ignore_errors=True)
+        self.generated.clear()
+
+    def command(self, case: str, tree: Path, metrics_dir: Path) -> list:
+        source = str(tree / "00_esoteric")
+        target = str(tree / "esoteric")
+        if case == "inventory":
+            return [sys.executable, str(INVENTORY), "--source", source, "--target", target,
+                    "--output", str(metrics_dir / "inventory.json"), "--metrics-dir", str(metrics_dir)]
+        cmd = [sys.executable, str(VALIDATOR), "--source", source, "--target", target,
+               "--report-dir", str(metrics_dir), "--metrics-dir", str(metrics_dir)]
+        if case == "validate_fix":
+            cmd.append("--fix")
+        return cmd
+
+    def run_case(self, case: str, size: int) -> Optional[dict]:
+        """Run one case several times; median wall time, max memory"""
+        runs = []
+        shared_tree = self.work_dir / f"library-{size}"
+        for i in range(self.repeat):
+            # --fix changes the tree, so every fix run gets a fresh copy
+            tree = self.generate(size, f"fix-{size}") if case == "validate_fix" else shared_tree
+            with tempfile.TemporaryDirectory(dir=self.work_dir) as metrics_dir:
+                result = run_measured(self.command(case, tree, Path(metrics_dir)))
+                if result["returncode"] != 0:
+                    print(f"  [ERROR] {case} @ {size} failed (exit {result['returncode']})")
+                    print("  " + result["stderr"].strip().replace("\n", "\n  "))
+                    self.report["summary"]["cases_failed"] += 1
+                    return None
+                prom = next(Path(metrics_dir).glob("*.prom"))
+                result.update(parse_textfile(prom))
+            runs.append(result)
+            print(f"  run {i + 1}/{self.repeat}: {result['wall_seconds']:.3f}s")
+
+        return {
+            "wall_seconds": statistics.median(r["wall_seconds"] for r in runs),
+            "wall_seconds_min": min(r["wall_seconds"] for r in runs),
+            "readdir": max(r.get("readdir", 0) for r in runs),
+            "stat": max(r.get("stat", 0) for r in runs),
+            "open": max(r.get("open", 0) for r in runs),
+            "peak_rss_bytes": max(r["peak_rss_bytes"] for r in runs),
+        }
+
+    def run(self):
+        """Generate trees and run every case at every size"""
+        print(f"Work dir: {self.work_dir}")
+        print(f"Sizes: {', '.join(str(s) for s in self.sizes)}")
+        print(f"Cases: {', '.join(self.cases)}")
+        print("=" * 60)
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        for size in self.sizes:
+            print(f"\n[GENERATE] {size} albums")
+            self.generate(size, f"library-{size}")
+            for case in self.cases:
+                print(f"[CASE] {case} @ {size}")
+                result = self.run_case(case, size)
+                if result:
+                    self.report["results"][f"{case}@{size}"] = result
+                    self.report["summary"]["cases_run"] += 1
+
+    def compare(self, baseline_path: Path):
+        """Flag metrics that grew beyond tolerance since the stored baseline"""
+        if not baseline_path.exists():
+            print(f"\nNo baseline at {baseline_path} (run with --update-baseline to create one)")
+            return
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        if baseline.get("seed") != self.seed:
+            print(f"\n[WARNING] Baseline was recorded with --seed {baseline.get('seed')}, not {self.seed}; "
+                  f"skipping comparison (use the same seed or --update-baseline)")
+            return
+        metrics = METRICS
+        if baseline.get("python") != self.report["python"]:
+            print(f"\n[WARNING] Baseline was recorded with Python {baseline.get('python')}; "
+                  f"skipping readdir/stat/open comparison")
+            metrics = [m for m in METRICS if m not in CALL_METRICS]
+        if baseline.get("host") != self.report["host"]:
+            print(f"\n[WARNING] Baseline was recorded on {baseline.get('host')}; wall times may not compare")
+
+        print("\n" + "=" * 60)
+        print("COMPARISON WITH BASELINE")
+        print("=" * 60)
+        for key, result in self.report["results"].items():
+            base = baseline.get("results", {}).get(key)
+            if not base:
+                print(f"{key}: no baseline")
+                continue
+            for metric in metrics:
+                old, new = base.get(metric), result.get(metric)
+                if not old or new is None:
+                    continue
+                change = (new - old) / old
+                marker = ""
+                if change > self.tolerances[metric]:
+                    marker = "  [REGRESSION]"
+                    self.report["regressions"].append({
+                        "case": key, "metric": metric, "baseline": old, "current": new,
+                        "change": round(change, 4),
+                    })
+                    self.report["summary"]["regressions"] += 1
+                elif change < -self.tolerances[metric]:
+                    marker = "  [IMPROVED]"
+                    self.report["summary"]["improvements"] += 1
+                print(f"{key:28} {metric:15} {old:>14.3f} -> {new:>14.3f} ({change:+.1%}){marker}")
+
+    def update_baseline(self, baseline_path: Path):
+        """Store current results as the new baseline (merged with other sizes)"""
+        baseline = {"results": {}}
+        if baseline_path.exists():
+            with open(baseline_path) as f:
+                baseline = json.load(f)
+            # Results from another seed or Python would not compare with these
+            if (baseline.get("seed"), baseline.get("python")) != (self.seed, self.report["python"]):
+                baseline["results"] = {}
+        baseline.update({
+            "generated": self.report["generated"],
+            "host": self.report["host"],
+            "python": self.report["python"],
+            "seed": self.seed,
+        })
+        baseline["results"].update(self.report["results"])
+        with open(baseline_path, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nBaseline saved: {baseline_path}")
+
+    def print_summary(self):
+        """Print benchmark results"""
+        print("\n" + "=" * 60)
+        print("RESULTS")
+        print("=" * 60)
+        print(f"{'case':28} {'wall (s)':>9} {'readdir':>9} {'stat':>10} {'open':>8} {'peak MiB':>9}")
+        for key, r in self.report["results"].items():
+            print(f"{key:28} {r['wall_seconds']:9.3f} {r['readdir']:9d} {r['stat']:10d} "
+                  f"{r['open']:8d} {r['peak_rss_bytes'] / 1024 ** 2:9.1f}")
+        s = self.report["summary"]
+        print(f"\nCases run: {s['cases_run']}  failed: {s['cases_failed']}  "
+              f"regressions: {s['regressions']}  improvements: {s['improvements']}")
+
+    def save_report(self, output_dir: Path):
+        """Save benchmark report to JSON"""
+        json_path = output_dir / "benchmark-report.json"
+        with open(json_path, "w") as f:
+            json.dump(self.report, f, indent=2)
+        print(f"\nJSON report saved: {json_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark inventory and validation scanners on synthetic libraries")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help=f"Library sizes in albums. Default: {' '.join(str(s) for s in DEFAULT_SIZES)}")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES, help="Cases to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case (median wall time is kept)")
+    parser.add_argument("--seed", type=int, default=0, help="Generator seed")
+    parser.add_argument("--work-dir", type=str, help="Where to generate trees (default: temporary directory)")
+    parser.add_argument("--keep", action="store_true", help="Keep generated trees")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help=f"Baseline file. Default: {DEFAULT_BASELINE}")
+    parser.add_argument("--update-baseline", action="store_true", help="Store results as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=DEFAULT_TIME_TOLERANCE,
+                        help=f"Allowed wall time growth. Default: {DEFAULT_TIME_TOLERANCE}")
+    parser.add_argument("--calls-tolerance", type=float, default=DEFAULT_CALLS_TOLERANCE,
+                        help=f"Allowed readdir/stat/open growth. Default: {DEFAULT_CALLS_TOLERANCE}")
+    parser.add_argument("--memory-tolerance", type=float, default=DEFAULT_MEMORY_TOLERANCE,
+                        help=f"Allowed peak memory growth. Default: {DEFAULT_MEMORY_TOLERANCE}")
+    parser.add_argument("--report-dir", type=str, default=".", help="Directory to save reports")
+
+    args = parser.parse_args()
+    # Only a directory created here may be removed as a whole
+    created_work_dir = args.work_dir is None
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="scanner-bench-")
+
+    benchmark = ScannerBenchmark(work_dir=work_dir, sizes=args.sizes, cases=args.cases, repeat=args.repeat,
+                                 seed=args.seed, time_tolerance=args.time_tolerance,
+                                 calls_tolerance=args.calls_tolerance, memory_tolerance=args.memory_tolerance)
+    try:
+        benchmark.run()
+    finally:
+        if not args.keep:
+            benchmark.cleanup()
+            if created_work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+    benchmark.print_summary()
+    if args.update_baseline:
+        benchmark.update_baseline(args.baseline)
+    else:
+        benchmark.compare(args.baseline)
+    benchmark.save_report(Path(args.report_dir))
+
+    if benchmark.report["summary"]["regressions"] or benchmark.report["summary"]["cases_failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,11 @@ if ! command -v ffmpeg &> /dev/null; then
     exit 1
 fi
 
+# Metrics (optional): METRICS_DIR=/var/lib/node_exporter/textfile_collector
+# writes a Prometheus textfile, PROFILE=1 prints the slowest discs and phases
+METRICS_JOB="convert_dsd_to_flac"
+source "$(dirname "$0")/run-metrics.sh"
+
 convert_disc() {
     local dsd_path="$1"
     local flac_path="$2"
@@ -31,6 +36,8 @@ convert_disc() {
     fi
     
     mkdir -p "$flac_path"
+    local disc_start
+    disc_start=$(now)
     
     # Convert each DSF file to FLAC
     for dsf in "$dsd_path"/*.dsf; do
@@ -40,21 +47,34 @@ convert_disc() {
             
             if [ -f "$output" ]; then
                 echo "  Skipping (exists): $filename"
+                record files skipped 1
             else
                 echo "  Converting: $filename"
+                local file_start
+                file_start=$(now)
                 ffmpeg -i "$dsf" -af "lowpass=24000" -sample_fmt s32 -ar 176400 "$output" -y -loglevel error
+                record phase ffmpeg "$(elapsed "$file_start")"
+                record files converted 1
+                record bytes_read - "$(file_size "$dsf")"
+                record bytes_written - "$(file_size "$output")"
             fi
         fi
     done
     
     # Copy CUE and XML files if present
+    local copy_start
+    copy_start=$(now)
     for ext in cue xml; do
         for f in "$dsd_path"/*.$ext; do
             if [ -f "$f" ]; then
                 cp "$f" "$flac_path/" 2>/dev/null || true
+                record bytes_read - "$(file_size "$f")"
+                record bytes_written - "$(file_size "$f")"
             fi
         done
     done
+    record phase copy "$(elapsed "$copy_start")"
+    record disc "$disc_name" "$(elapsed "$disc_start")"
     
     echo "DONE: $disc_name"
 }
@@ -63,6 +83,7 @@ echo "=============================================="
 echo "DSD to FLAC Conversion"
 echo "=============================================="
 echo "Converting 13 discs..."
+RUN_START=$(now)
 
 # Carmen Disk2
 convert_disc \
@@ -144,3 +165,5 @@ echo "=============================================="
 echo "CONVERSION COMPLETE"
 echo "=============================================="
 echo "Converted 13 discs from DSD to FLAC"
+
+write_metrics
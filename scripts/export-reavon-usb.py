@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+Reavon USB Exporter
+
+Bin-packs whole DSD albums from the NAS onto one or more USB drives for the
+Reavon UBR-X110 (USB is its only working file source), copies them with large
+sequential writes and writes a per-drive manifest.
+
+Albums already present on a drive stay on that drive, so re-exports only copy
+what is new or changed.
+
+Usage:
+    python export-reavon-usb.py --drive /Volumes/REAVON1 --drive /Volumes/REAVON2
+    python export-reavon-usb.py --drive /Volumes/REAVON1 --genre 00_esoteric --apply
+    python export-reavon-usb.py --drive /Volumes/REAVON1 --favorites favorites.txt --apply
+    python export-reavon-usb.py --drive /Volumes/REAVON1 --box-sets
+"""
+
+import os
+import re
+import json
+import shutil
+import argparse
+from pathlib import Path
+from datetime import datetime
+from typing import Optional
+
+# Default paths - can be overridden via CLI
+DEFAULT_SOURCE = "/Volumes/xnas/00_DSD"
+DEFAULT_DRIVE_FOLDER = "DSD"
+MANIFEST_NAME = "reavon-manifest.json"
+
+# exFAT defaults for 64GB-256GB sticks; FAT32 caps single files at 4 GiB - 1
+DEFAULT_CLUSTER_SIZE = 128 * 1024
+FAT32_MAX_FILE_SIZE = 4 * 1024 ** 3 - 1
+EXFAT_MAX_NAME_LENGTH = 255
+EXFAT_INVALID_CHARS = re.compile(r'[\x00-\x1f"*/:<>?\\|]')
+
+# Keep some headroom so the drive never fills up completely
+DEFAULT_RESERVE = 256 * 1024 ** 2
+COPY_BUFFER_SIZE = 8 * 1024 ** 2
+
+JUNK_NAMES = {".DS_Store", "Thumbs.db", "desktop.ini"}
+
+
+def format_size(num_bytes: int) -> str:
+    """Human readable size (GiB/MiB)"""
+    if num_bytes >= 1024 ** 3:
+        return f"{num_bytes / 1024 ** 3:.2f} GiB"
+    return f"{num_bytes / 1024 ** 2:.1f} MiB"
+
+
+def exfat_name(name: str) -> str:
+    """Make a file or folder name valid on exFAT"""
+    name = EXFAT_INVALID_CHARS.sub("_", name).rstrip(" .")
+    return name or "_"
+
+
+class ReavonExporter:
+    def __init__(self, source_path: str, drives: list, dry_run: bool = True,
+                 cluster_size: int = DEFAULT_CLUSTER_SIZE, reserve: int = DEFAULT_RESERVE,
+                 fat32: bool = False, prune: bool = False):
+        self.source_path = Path(source_path)
+        self.drives = [Path(d) for d in drives]
+        self.dry_run = dry_run
+        self.cluster_size = cluster_size
+        self.reserve = reserve
+        self.fat32 = fat32
+        self.prune = prune
+
+        self.report = {
+            "generated": datetime.now().isoformat(),
+            "source": str(self.source_path),
+            "dry_run": dry_run,
+            "drives": [],
+            "unplaced": [],
+            "rejected": [],
+            "summary": {
+                "albums_selected": 0,
+                "albums_placed": 0,
+                "albums_reused": 0,
+                "albums_unplaced": 0,
+                "albums_rejected": 0,
+                "albums_pruned": 0,
+                "albums_incomplete": 0,
+                "files_copied": 0,
+                "files_failed": 0,
+                "files_skipped": 0,
+                "bytes_copied": 0,
+            }
+        }
+
+    def is_junk(self, name: str) -> bool:
+        """AppleDouble and Finder/Explorer metadata never goes to the stick"""
+        return name.startswith("._") or name in JUNK_NAMES
+
+    def on_disk_size(self, size: int) -> int:
+        """Size a file occupies on the drive, rounded up to whole clusters"""
+        if size == 0:
+            return 0
+        clusters = (size + self.cluster_size - 1) // self.cluster_size
+        return clusters * self.cluster_size
+
+    def scan_album(self, album_path: Path) -> dict:
+        """Walk an album once and collect its files, sizes and exFAT problems"""
+        files = []
+        problems = []
+        stack = [(album_path, "")]
+        while stack:
+            folder, rel = stack.pop()
+            try:
+                entries = list(os.scandir(folder))
+            except OSError as e:
+                problems.append(f"UNREADABLE: {folder} ({e})")
+                continue
+            for entry in entries:
+                if self.is_junk(entry.name) or entry.is_symlink():
+                    continue
+                rel_name = f"{rel}/{entry.name}" if rel else entry.name
+                if len(entry.name) > EXFAT_MAX_NAME_LENGTH:
+                    problems.append(f"NAME_TOO_LONG: {rel_name}")
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((Path(entry.path), rel_name))
+                elif entry.is_file(follow_symlinks=False):
+                    st = entry.stat(follow_symlinks=False)
+                    if self.fat32 and st.st_size > FAT32_MAX_FILE_SIZE:
+                        problems.append(f"FILE_TOO_LARGE_FOR_FAT32: {rel_name}")
+                    files.append({"rel": rel_name, "size": st.st_size, "mtime": st.st_mtime})
+        files.sort(key=lambda f: f["rel"])
+        return {
+            "files": files,
+            "size": sum(f["size"] for f in files),
+            "disk_size": sum(self.on_disk_size(f["size"]) for f in files),
+            "problems": problems,
+        }
+
+    def is_box_set(self, album_path: Path) -> bool:
+        """Box set = album folder holding sub-album folders with their own ISOs/discs"""
+        match = re.search(r'\(Esoteric,\s*(\d+)x?(SACD|DSD)\)', album_path.name)
+        if match and int(match.group(1)) > 1:
+            for item in album_path.iterdir():
+                if item.is_dir() and ("Esoteric" in item.name or "SACD" in item.name
+                                      or re.search(r'\(\d+\s*discs?\)', item.name)):
+                    return True
+        return False
+
+    def load_favorites(self, favorites_file: Optional[str]) -> list:
+        """Read favorites file: one (partial) album name per line, # for comments"""
+        if not favorites_file:
+            return []
+        with open(favorites_file) as f:
+            return [line.strip().lower() for line in f
+                    if line.strip() and not line.startswith("#")]
+
+    def select_albums(self, genres: Optional[list], favorites: list, box_sets: bool) -> list:
+        """Collect (genre, album_path) pairs matching the selection"""
+        genre_dirs = [d for d in sorted(self.source_path.iterdir())
+                      if d.is_dir() and not d.name.startswith(".")]
+        if genres:
+            wanted = {g.lower() for g in genres}
+            genre_dirs = [d for d in genre_dirs if d.name.lower() in wanted]
+
+        selected = []
+        for genre_dir in genre_dirs:
+            for album in sorted(genre_dir.iterdir()):
+                if not album.is_dir() or album.name.startswith("."):
+                    continue
+                if favorites or box_sets:
+                    is_favorite = any(fav in album.name.lower() for fav in favorites)
+                    if not (is_favorite or (box_sets and self.is_box_set(album))):
+                        continue
+                selected.append((genre_dir.name, album))
+        return selected
+
+    def read_drive(self, drive: Path) -> dict:
+        """Find what an earlier export left on the drive"""
+        export_root = drive / DEFAULT_DRIVE_FOLDER
+        existing = {}
+        if not export_root.exists():
+            return existing
+        for genre_dir in export_root.iterdir():
+            if not genre_dir.is_dir() or self.is_junk(genre_dir.name):
+                continue
+            for album in genre_dir.iterdir():
+                if album.is_dir() and not self.is_junk(album.name):
+                    existing[(genre_dir.name, album.name)] = album
+        return existing
+
+    def drive_capacity(self, drive: Path) -> int:
+        """Bytes available for new albums (free space minus reserve)"""
+        usage = shutil.disk_usage(drive)
+        return max(usage.free - self.reserve, 0)
+
+    def plan(self, albums: list) -> list:
+        """Assign whole albums to drives: reuse first, then first-fit decreasing"""
+        bins = []
+        for drive in self.drives:
+            existing = self.read_drive(drive)
+            bins.append({
+                "drive": drive,
+                "existing": existing,
+                "free": self.drive_capacity(drive),
+                "albums": [],
+                "kept": [],
+                "stale": [],
+            })
+
+        # Stale albums are known before placement; pruning them frees space
+        # that both grown reused albums and new albums can use
+        selected_keys = {(exfat_name(g), exfat_name(p.name)) for g, p, _ in albums}
+        for b in bins:
+            for key, path in sorted(b["existing"].items()):
+                if key not in selected_keys:
+                    b["stale"].append(path)
+                    if self.prune:
+                        b["free"] += self.scan_album(path)["disk_size"]
+
+        pending = []
+        for genre, album_path, scan in albums:
+            key = (exfat_name(genre), exfat_name(album_path.name))
+            home = next((b for b in bins if key in b["existing"]), None)
+            if home is None:
+                pending.append((genre, album_path, scan))
+                continue
+            # Only the part not yet on the drive needs new space
+            on_drive = self.scan_album(home["existing"][key])
+            delta = max(scan["disk_size"] - on_drive["disk_size"], 0)
+            if delta > home["free"]:
+                # Relocating would leave the old copy behind on its home drive,
+                # so keep that copy as is and report the album as partial
+                print(f"[UNPLACED] {album_path.name} grew by {format_size(delta)}, "
+                      f"no room left on {home['drive']} (existing copy kept)")
+                self.report["unplaced"].append({
+                    "album": album_path.name,
+                    "genre": genre,
+                    "size": scan["disk_size"],
+                    "partial": str(home["existing"][key]),
+                })
+                self.report["summary"]["albums_unplaced"] += 1
+                home["kept"].append({"genre": genre, "path": album_path, "scan": on_drive,
+                                     "drive_path": home["existing"][key]})
+                continue
+            home["free"] -= delta
+            home["albums"].append({"genre": genre, "path": album_path, "scan": scan, "reused": True})
+            self.report["summary"]["albums_reused"] += 1
+
+        pending.sort(key=lambda a: a[2]["disk_size"], reverse=True)
+        for genre, album_path, scan in pending:
+            target = next((b for b in bins if scan["disk_size"] <= b["free"]), None)
+            if target is None:
+                print(f"[UNPLACED] {album_path.name} ({format_size(scan['disk_size'])}) does not fit on any drive")
+                self.report["unplaced"].append({
+                    "album": album_path.name,
+                    "genre": genre,
+                    "size": scan["disk_size"],
+                })
+                self.report["summary"]["albums_unplaced"] += 1
+                continue
+            target["free"] -= scan["disk_size"]
+            target["albums"].append({"genre": genre, "path": album_path, "scan": scan, "reused": False})
+
+        for b in bins:
+            self.report["summary"]["albums_placed"] += len(b["albums"])
+        return bins
+
+    def copy_file(self, src: Path, dest: Path, size: int, mtime: float) -> bool:
+        """Stream one file with large sequential writes, skipping unchanged copies"""
+        if dest.exists():
+            st = dest.stat()
+            # exFAT keeps mtime at 10ms resolution, FAT32 at 2s
+            if st.st_size == size and abs(st.st_mtime - mtime) <= 2:
+                self.report["summary"]["files_skipped"] += 1
+                return False
+        if self.dry_run:
+            self.report["summary"]["files_copied"] += 1
+            self.report["summary"]["bytes_copied"] += size
+            return True
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        partial = dest.with_name(dest.name + ".partial")
+        try:
+            with open(src, "rb") as fin, open(partial, "wb") as fout:
+                shutil.copyfileobj(fin, fout, COPY_BUFFER_SIZE)
+            os.utime(partial, (mtime, mtime))
+            os.replace(partial, dest)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+        self.report["summary"]["files_copied"] += 1
+        self.report["summary"]["bytes_copied"] += size
+        return True
+
+    def export_album(self, drive: Path, album: dict) -> list:
+        """Copy one album to the drive, returning the files that failed to copy"""
+        dest_album = drive / DEFAULT_DRIVE_FOLDER / exfat_name(album["genre"]) / exfat_name(album["path"].name)
+        copied = 0
+        failed = []
+        for f in album["scan"]["files"]:
+            rel_parts = [exfat_name(part) for part in f["rel"].split("/")]
+            try:
+                if self.copy_file(album["path"] / f["rel"], dest_album.joinpath(*rel_parts),
+                                  f["size"], f["mtime"]):
+                    copied += 1
+            except OSError as e:
+                print(f"  [ERROR] Failed to copy {f['rel']}: {e}")
+                failed.append(f["rel"])
+        status = "REUSED" if album["reused"] else "NEW"
+        verb = "Would copy" if self.dry_run else "Copied"
+        print(f"  [{status}] {album['path'].name}: {verb} {copied} of {len(album['scan']['files'])} files")
+        if failed:
+            print(f"  [INCOMPLETE] {album['path'].name}: {len(failed)} file(s) failed")
+            self.report["summary"]["albums_incomplete"] += 1
+            self.report["summary"]["files_failed"] += len(failed)
+        return failed
+
+    def prune_album(self, album_path: Path):
+        """Remove an album that is no longer part of the selection"""
+        if self.dry_run:
+            print(f"  [DRY-RUN] Would remove stale album: {album_path.name}")
+            return
+        try:
+            shutil.rmtree(album_path)
+            print(f"  [FIXED] Removed stale album: {album_path.name}")
+        except OSError as e:
+            print(f"  [ERROR] Failed to remove {album_path}: {e}")
+
+    def build_manifest(self, drive_bin: dict) -> dict:
+        """Per-drive manifest: which albums (and discs) live on this stick"""
+        albums = []
+        # Kept albums are older copies left in place because the new version did not fit
+        entries = [(a, "incomplete" if a.get("failed") else "complete") for a in drive_bin["albums"]]
+        entries += [(a, "partial") for a in drive_bin["kept"]]
+        for album, status in sorted(entries, key=lambda e: (e[0]["genre"], e[0]["path"].name)):
+            discs = sorted({f["rel"].split("/")[0] for f in album["scan"]["files"] if "/" in f["rel"]})
+            if status == "partial":
+                drive_path = album["drive_path"].relative_to(drive_bin["drive"]).as_posix()
+            else:
+                drive_path = f"{DEFAULT_DRIVE_FOLDER}/{exfat_name(album['genre'])}/{exfat_name(album['path'].name)}"
+            entry = {
+                "name": album["path"].name,
+                "genre": album["genre"],
+                "source": str(album["path"]),
+                "drive_path": drive_path,
+                "status": status,
+                "files": len(album["scan"]["files"]) - len(album.get("failed", [])),
+                "size": album["scan"]["disk_size"],
+                "folders": discs,
+            }
+            if status == "incomplete":
+                missing = set(album["failed"])
+                entry["missing"] = album["failed"]
+                entry["size"] -= sum(self.on_disk_size(f["size"]) for f in album["scan"]["files"]
+                                     if f["rel"] in missing)
+            albums.append(entry)
+        return {
+            "generated": self.report["generated"],
+            "drive": drive_bin["drive"].name,
+            "mount": str(drive_bin["drive"]),
+            "albums": albums,
+            "stale": [str(p) for p in drive_bin["stale"]],
+            "total_size": sum(a["size"] for a in albums),
+            "free_after_export": drive_bin["free"],
+        }
+
+    def run(self, genres: Optional[list] = None, favorites_file: Optional[str] = None,
+            box_sets: bool = False):
+        """Select, plan and export"""
+        print(f"Source: {self.source_path}")
+        print(f"Drives: {', '.join(str(d) for d in self.drives)}")
+        print(f"Mode: {'DRY-RUN' if self.dry_run else 'EXPORTING'}")
+        print("=" * 60)
+
+        if not self.source_path.exists():
+            print(f"ERROR: Source path does not exist: {self.source_path}")
+            return
+        for drive in self.drives:
+            if not drive.exists():
+                print(f"ERROR: Drive not mounted: {drive}")
+                return
+
+        albums = []
+        for genre, album_path in self.select_albums(genres, self.load_favorites(favorites_file), box_sets):
+            scan = self.scan_album(album_path)
+            if scan["problems"]:
+                print(f"[REJECTED] {album_path.name}")
+                for problem in scan["problems"]:
+                    print(f"  {problem}")
+                self.report["rejected"].append({"album": album_path.name, "problems": scan["problems"]})
+                self.report["summary"]["albums_rejected"] += 1
+                continue
+            albums.append((genre, album_path, scan))
+        self.report["summary"]["albums_selected"] = len(albums) + len(self.report["rejected"])
+
+        for drive_bin in self.plan(albums):
+            print(f"\n[DRIVE] {drive_bin['drive']}")
+            for stale in drive_bin["stale"]:
+                if self.prune:
+                    self.prune_album(stale)
+                    self.report["summary"]["albums_pruned"] += 1
+                else:
+                    print(f"  [STALE] Not in selection (use --prune to remove): {stale.name}")
+            for album in drive_bin["albums"]:
+                album["failed"] = self.export_album(drive_bin["drive"], album)
+            manifest = self.build_manifest(drive_bin)
+            self.report["drives"].append(manifest)
+            print(f"  Albums: {len(manifest['albums'])}, {format_size(manifest['total_size'])}, "
+                  f"free after export: {format_size(manifest['free_after_export'])}")
+            if not self.dry_run:
+                with open(drive_bin["drive"] / MANIFEST_NAME, "w") as f:
+                    json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+        self.print_summary()
+
+    def print_summary(self):
+        """Print summary of the export"""
+        print("\n" + "=" * 60)
+        print("SUMMARY")
+        print("=" * 60)
+        s = self.report["summary"]
+        print(f"Albums selected:       {s['albums_selected']}")
+        print(f"Albums placed:         {s['albums_placed']}")
+        print(f"Albums reused:         {s['albums_reused']}")
+        print(f"Albums unplaced:       {s['albums_unplaced']}")
+        print(f"Albums rejected:       {s['albums_rejected']}")
+        print(f"Albums pruned:         {s['albums_pruned']}")
+        print(f"Albums incomplete:     {s['albums_incomplete']}")
+        print(f"Files copied:          {s['files_copied']}")
+        print(f"Files already on USB:  {s['files_skipped']}")
+        print(f"Files failed:          {s['files_failed']}")
+        print(f"Data copied:           {format_size(s['bytes_copied'])}")
+
+    def save_report(self, output_dir: Path):
+        """Save combined report to JSON and a per-drive text manifest"""
+        json_path = output_dir / "reavon-export-report.json"
+        with open(json_path, "w") as f:
+            json.dump(self.report, f, indent=2, ensure_ascii=False)
+        print(f"\nJSON report saved: {json_path}")
+
+        txt_path = output_dir / "reavon-export-report.txt"
+        with open(txt_path, "w") as f:
+            f.write("# Reavon USB Export Manifest\n")
+            f.write(f"# Generated: {self.report['generated']}\n")
+            f.write(f"# Mode: {'DRY-RUN' if self.dry_run else 'APPLIED'}\n")
+            f.write("=" * 60 + "\n\n")
+
+            for drive in self.report["drives"]:
+                f.write(f"## DRIVE: {drive['drive']} ({format_size(drive['total_size'])})\n\n")
+                for album in drive["albums"]:
+                    marker = "" if album["status"] == "complete" else f" [{album['status'].upper()}]"
+                    f.write(f"{album['genre']}/{album['name']}{marker}\n")
+                    if album["folders"]:
+                        f.write(f"  {', '.join(album['folders'])}\n")
+                f.write("\n")
+
+            if self.report["unplaced"]:
+                f.write("## UNPLACED (no room on any drive)\n\n")
+                for item in self.report["unplaced"]:
+                    f.write(f"{item['genre']}/{item['album']} ({format_size(item['size'])})\n")
+                    if item.get("partial"):
+                        f.write(f"  existing copy kept: {item['partial']}\n")
+                f.write("\n")
+
+            if self.report["rejected"]:
+                f.write("## REJECTED (exFAT/FAT32 limits)\n\n")
+                for item in self.report["rejected"]:
+                    f.write(f"{item['album']}\n")
+                    for problem in item["problems"]:
+                        f.write(f"  {problem}\n")
+                f.write("\n")
+
+            f.write("## SUMMARY\n\n")
+            for key, value in self.report["summary"].items():
+                f.write(f"{key}: {value}\n")
+        print(f"Text report saved: {txt_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bin-pack and export DSD albums to Reavon USB drives")
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help=f"DSD library root. Default: {DEFAULT_SOURCE}")
+    parser.add_argument("--drive", action="append", required=True, help="Mounted USB drive (repeat for several)")
+    parser.add_argument("--genre", action="append", help="Genre folder under source (repeatable)")
+    parser.add_argument("--favorites", type=str, help="File with one (partial) album name per line")
+    parser.add_argument("--box-sets", action="store_true", help="Select box sets")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would be done")
+    parser.add_argument("--apply", action="store_true", help="Copy files (default is dry-run)")
+    parser.add_argument("--prune", action="store_true", help="Remove albums on the drives that are no longer selected")
+    parser.add_argument("--fat32", action="store_true", help="Drives are FAT32 (reject files over 4 GiB)")
+    parser.add_argument("--cluster-size", type=int, default=DEFAULT_CLUSTER_SIZE,
+                        help=f"Drive cluster size in bytes. Default: {DEFAULT_CLUSTER_SIZE}")
+    parser.add_argument("--report-dir", type=str, default=".", help="Directory to save reports")
+
+    args = parser.parse_args()
+    dry_run = not args.apply
+
+    exporter = ReavonExporter(source_path=args.source, drives=args.drive, dry_run=dry_run,
+                              cluster_size=args.cluster_size, fat32=args.fat32, prune=args.prune)
+    exporter.run(genres=args.genre, favorites_file=args.favorites, box_sets=args.box_sets)
+    exporter.save_report(Path(args.report_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,11 @@ if [ ! -d "$TARGET_BASE" ]; then
     exit 1
 fi
 
+# Metrics (optional): METRICS_DIR=/var/lib/node_exporter/textfile_collector
+# writes a Prometheus textfile, PROFILE=1 prints the slowest discs and phases
+METRICS_JOB="extract_missing_sacds"
+source "$(dirname "$0")/run-metrics.sh"
+
 extract_iso() {
     local iso_path="$1"
     local output_dir="$2"
@@ -43,11 +48,20 @@ extract_iso() {
     fi
     
     mkdir -p "$output_dir"
+    local disc_start
+    disc_start=$(now)
+    mark_start
     
     # Extract to DSF format with CUE sheet
     # -2 = 2-channel, -s = DSF format, -C = export CUE
     $SACD_EXTRACT -2 -s -C -i "$iso_path" -o "$output_dir"
     
+    record phase sacd_extract "$(elapsed "$disc_start")"
+    record disc "$disc_name" "$(elapsed "$disc_start")"
+    record files extracted "$(new_files_count "$output_dir" '*.dsf')"
+    record bytes_read - "$(file_size "$iso_path")"
+    record bytes_written - "$(new_files_size "$output_dir" '*.dsf' '*.cue')"
+    
     echo "DONE: $disc_name"
 }
 
@@ -56,6 +70,7 @@ echo "SACD Extraction Script"
 echo "=============================================="
 echo "This will extract 13 missing discs to DSD"
 echo ""
+RUN_START=$(now)
 
 # Carmen - Disk2
 extract_iso \
@@ -134,6 +149,7 @@ echo "=============================================="
 echo "EXTRACTION COMPLETE"
 echo "=============================================="
 echo "Extracted 13 discs"
+write_metrics
 echo ""
 echo "Next steps:"
 echo "1. Run validate-esoteric.py --fix to fix folder structure"
@@ -74,12 +74,14 @@ clean_apple_files() {
     if [[ "$CLEAN_APPLE" == "true" ]]; then
         echo -e "${GREEN}Cleaning AppleDouble ._ files...${NC}"
 
-        local count=$(find "$BASE_PATH" -type f -name "._*" | wc -l | tr -d ' ')
-
+        # Single pass: count what find prints instead of walking twice
+        # (sweep-library-junk.py covers the whole NAS and more junk types)
+        local count
         if [[ "$DRY_RUN" == "true" ]]; then
+            count=$(find "$BASE_PATH" -type f -name "._*" -print | wc -l | tr -d ' ')
             echo "Would delete $count ._ files"
         else
-            find "$BASE_PATH" -type f -name "._*" -delete
+            count=$(find "$BASE_PATH" -type f -name "._*" -print -delete | wc -l | tr -d ' ')
             echo "Deleted $count ._ files"
         fi
         echo ""
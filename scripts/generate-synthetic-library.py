@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Synthetic Esoteric Library Generator
+
+Builds a fake source (SACD ISOs) and target (extracted DSDs) tree that mimics
+the real collection, so inventory-esoteric.py and validate-esoteric.py can be
+tested and benchmarked at 100-50,000 albums without the real drives.
+
+The generated tree contains box sets with sub-albums, "(Esoteric, 14SACD)"
+names, Disk1/disc 2/CD3/"(Disc 1)" folder variants, sacd_extract wrapper and
+nested folders, symlinks, AppleDouble files and sparse .iso/.dsf files (they
+take almost no real disk space).
+
+Usage:
+    python generate-synthetic-library.py --albums 2000 --output /tmp/synthetic
+    python generate-synthetic-library.py --albums 50000 --output /tmp/synthetic --seed 7
+"""
+
+import os
+import json
+import random
+import argparse
+from pathlib import Path
+from datetime import datetime
+
+MIN_ALBUMS = 100
+MAX_ALBUMS = 50000
+
+SOURCE_FOLDER = "00_esoteric"
+TARGET_FOLDER = "esoteric"
+
+# Sparse file sizes (apparent size only)
+ISO_SIZE = 3 * 1024 ** 3
+DSF_SIZE = 180 * 1024 ** 2
+
+COMPOSERS = [
+    "Bach", "Beethoven", "Brahms", "Bruckner", "Bizet", "Chopin", "Debussy", "Dvorak",
+    "Elgar", "Grieg", "Handel", "Haydn", "Mahler", "Mendelssohn", "Mozart", "Mussorgsky",
+    "Puccini", "Rachmaninov", "Ravel", "Schubert", "Schumann", "Sibelius", "Strauss",
+    "Stravinsky", "Tchaikovsky", "Verdi", "Vivaldi", "Wagner",
+]
+WORKS = [
+    "Symphony No. {n}", "Piano Concerto No. {n}", "Violin Concerto", "Requiem",
+    "String Quartets", "Cello Sonatas", "Carmen", "Aida", "Tosca", "La Boheme",
+    "The Four Seasons", "Goldberg Variations", "Piano Sonatas", "Overtures",
+    "Das Rheingold", "Die Walküre", "Siegfried", "Götterdämmerung",
+]
+PERFORMERS = [
+    "Karajan", "Solti", "Bernstein", "Kleiber", "Böhm", "Abbado", "Callas",
+    "Richter", "Gould", "Argerich", "Rostropovich", "Mravinsky", "Szell",
+]
+
+# Share of albums getting each layout quirk
+BOX_SET_RATE = 0.08
+DSD_ORIGINAL_RATE = 0.05
+MULTI_DISC_RATE = 0.25
+MISSING_ALBUM_RATE = 0.02
+MISSING_DISC_RATE = 0.05
+WRAPPER_RATE = 0.05
+NESTED_RATE = 0.08
+SYMLINK_RATE = 0.03
+APPLEDOUBLE_RATE = 0.30
+COVER_RATE = 0.7
+
+DISC_FOLDER_STYLES = [
+    lambda album, n: f"Disk{n}",
+    lambda album, n: f"disc {n}",
+    lambda album, n: f"CD{n}",
+    lambda album, n: f"{album} (Disc {n})",
+]
+
+
+def sparse_file(path: Path, size: int):
+    """Create a file with the given apparent size without writing data"""
+    with open(path, "wb") as f:
+        f.truncate(size)
+
+
+class SyntheticLibrary:
+    def __init__(self, output_path: str, albums: int, seed: int = 0, tracks: int = 3):
+        self.output_path = Path(output_path)
+        self.source_path = self.output_path / SOURCE_FOLDER
+        self.target_path = self.output_path / TARGET_FOLDER
+        self.albums = albums
+        self.tracks = tracks
+        self.rng = random.Random(seed)
+        self.used_names = set()
+
+        self.report = {
+            "generated": datetime.now().isoformat(),
+            "output": str(self.output_path),
+            "seed": seed,
+            "summary": {
+                "albums": 0,
+                "box_sets": 0,
+                "sub_albums": 0,
+                "dsd_originals": 0,
+                "source_isos": 0,
+                "target_discs": 0,
+                "missing_albums": 0,
+                "missing_discs": 0,
+                "wrapper_folders": 0,
+                "nested_folders": 0,
+                "symlinks": 0,
+                "appledouble_files": 0,
+                "dsf_files": 0,
+            }
+        }
+
+    def chance(self, rate: float) -> bool:
+        return self.rng.random() < rate
+
+    def album_title(self) -> str:
+        """Unique "Composer - Work (Performer, Year)" title"""
+        while True:
+            work = self.rng.choice(WORKS).format(n=self.rng.randint(1, 9))
+            title = (f"{self.rng.choice(COMPOSERS)} - {work} "
+                     f"({self.rng.choice(PERFORMERS)}, {self.rng.randint(1955, 2020)})")
+            if title not in self.used_names:
+                self.used_names.add(title)
+                return title
+            # Disambiguate repeated combinations the way real reissues do
+            title = f"{title} [{len(self.used_names)}]"
+            if title not in self.used_names:
+                self.used_names.add(title)
+                return title
+
+    def write_tracks(self, folder: Path, disc_num: int):
+        """Sparse DSF tracks plus optional AppleDouble companions"""
+        folder.mkdir(parents=True, exist_ok=True)
+        for track in range(1, self.tracks + 1):
+            name = f"{disc_num:02d}-{track:02d} Track {track}.dsf"
+            sparse_file(folder / name, DSF_SIZE)
+            self.report["summary"]["dsf_files"] += 1
+            if self.chance(APPLEDOUBLE_RATE):
+                (folder / f"._{name}").write_bytes(b"\x00\x05\x16\x07")
+                self.report["summary"]["appledouble_files"] += 1
+
+    def write_source(self, folder: Path, title: str, discs: int):
+        """Source album: one sparse ISO per disc, optional cover and artwork"""
+        folder.mkdir(parents=True, exist_ok=True)
+        for disc in range(1, discs + 1):
+            iso_name = f"{title.split(' (')[0]} disc{disc}.iso" if discs > 1 else f"{title.split(' (')[0]}.iso"
+            sparse_file(folder / iso_name, ISO_SIZE)
+            self.report["summary"]["source_isos"] += 1
+        if self.chance(COVER_RATE):
+            (folder / "cover.jpg").write_bytes(b"\xff\xd8\xff\xe0")
+        elif self.chance(0.5):
+            (folder / "Artwork").mkdir(exist_ok=True)
+            (folder / "Artwork" / "front.jpg").write_bytes(b"\xff\xd8\xff\xe0")
+        if self.chance(APPLEDOUBLE_RATE):
+            (folder / "._cover.jpg").write_bytes(b"\x00\x05\x16\x07")
+            self.report["summary"]["appledouble_files"] += 1
+
+    def write_target(self, folder: Path, title: str, discs: int):
+        """Extracted album with the naming quirks sacd_extract and manual fixes leave behind"""
+        if self.chance(MISSING_ALBUM_RATE):
+            self.report["summary"]["missing_albums"] += 1
+            return
+        folder.mkdir(parents=True, exist_ok=True)
+        base = title.split(" (")[0]
+
+        if discs == 1 and not self.chance(NESTED_RATE):
+            self.write_tracks(folder, 1)
+            self.report["summary"]["target_discs"] += 1
+        else:
+            disc_parent = folder
+            if discs > 1 and self.chance(WRAPPER_RATE):
+                disc_parent = folder / base.replace(":", "_").replace(" - ", "_ ")
+                self.report["summary"]["wrapper_folders"] += 1
+            style = self.rng.choice(DISC_FOLDER_STYLES)
+            for disc in range(1, discs + 1):
+                if discs > 1 and self.chance(MISSING_DISC_RATE):
+                    self.report["summary"]["missing_discs"] += 1
+                    continue
+                disc_folder = disc_parent / style(base, disc)
+                if self.chance(NESTED_RATE):
+                    disc_folder = disc_folder / f"{base} (Disc {disc})"
+                    self.report["summary"]["nested_folders"] += 1
+                self.write_tracks(disc_folder, disc)
+                self.report["summary"]["target_discs"] += 1
+
+        if self.chance(SYMLINK_RATE):
+            link = folder / "cover.jpg"
+            if not link.exists():
+                os.symlink("../../covers/missing.jpg", link)
+                self.report["summary"]["symlinks"] += 1
+
+    def make_album(self):
+        """One top-level album: single, multi-disc, DSD original or box set"""
+        title = self.album_title()
+        if self.chance(BOX_SET_RATE):
+            self.make_box_set(title)
+            return
+        if self.chance(DSD_ORIGINAL_RATE):
+            folder = self.source_path / f"{title} (Esoteric, DSD)"
+            self.write_tracks(folder, 1)
+            self.report["summary"]["dsd_originals"] += 1
+            return
+        discs = self.rng.randint(2, 4) if self.chance(MULTI_DISC_RATE) else 1
+        marker = f"{discs}SACD" if discs > 1 else "SACD"
+        self.write_source(self.source_path / f"{title} (Esoteric, {marker})", title, discs)
+        self.write_target(self.target_path / f"{title} (Esoteric, DSDe)", title, discs)
+
+    def make_box_set(self, title: str):
+        """Box set like the Solti Ring: numbered sub-albums with their own discs"""
+        sub_count = self.rng.randint(2, 5)
+        sub_discs = [self.rng.randint(1, 4) for _ in range(sub_count)]
+        box_source = self.source_path / f"{title} (Esoteric, {sum(sub_discs)}SACD)"
+        box_target = self.target_path / f"{title} (Esoteric, DSDe)"
+        numbered = self.chance(0.5)
+        for i, discs in enumerate(sub_discs, start=1):
+            sub_title = self.album_title()
+            if numbered:
+                # "1. Vorabend - Das Rheingold 1853-54 (2 discs)" style
+                source_name = f"{i}. {sub_title} ({discs} discs)"
+                target_name = source_name
+            else:
+                marker = f"{discs}SACD" if discs > 1 else "SACD"
+                source_name = f"{sub_title} (Esoteric, {marker})"
+                target_name = f"{sub_title} (Esoteric, DSDe)"
+            self.write_source(box_source / source_name, sub_title, discs)
+            if box_target.exists() or not self.chance(MISSING_ALBUM_RATE):
+                self.write_target(box_target / target_name, sub_title, discs)
+            self.report["summary"]["sub_albums"] += 1
+        (box_source / "Artwork").mkdir(exist_ok=True)
+        self.report["summary"]["box_sets"] += 1
+
+    def generate(self):
+        """Generate the whole library"""
+        print(f"Output: {self.output_path}")
+        print(f"Albums: {self.albums}")
+        print("=" * 60)
+        self.source_path.mkdir(parents=True, exist_ok=True)
+        self.target_path.mkdir(parents=True, exist_ok=True)
+        for i in range(self.albums):
+            self.make_album()
+            self.report["summary"]["albums"] += 1
+            if (i + 1) % 1000 == 0:
+                print(f"  Generated {i + 1} albums...")
+        self.print_summary()
+
+    def print_summary(self):
+        """Print summary of the generated tree"""
+        print("\n" + "=" * 60)
+        print("SUMMARY")
+        print("=" * 60)
+        for key, value in self.report["summary"].items():
+            print(f"{key + ':':22} {value}")
+
+    def save_report(self):
+        """Save generation summary next to the generated tree"""
+        json_path = self.output_path / "synthetic-library.json"
+        with open(json_path, "w") as f:
+            json.dump(self.report, f, indent=2)
+        print(f"\nJSON report saved: {json_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Esoteric library for tests and benchmarks")
+    parser.add_argument("--output", required=True, help="Directory to create the library in")
+    parser.add_argument("--albums", type=int, default=2000, help=f"Top-level albums ({MIN_ALBUMS}-{MAX_ALBUMS})")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (same seed = same tree)")
+    parser.add_argument("--tracks", type=int, default=3, help="Tracks per disc")
+
+    args = parser.parse_args()
+    if not MIN_ALBUMS <= args.albums <= MAX_ALBUMS:
+        parser.error(f"--albums must be between {MIN_ALBUMS} and {MAX_ALBUMS}")
+    if Path(args.output).exists() and any(Path(args.output).iterdir()):
+        parser.error(f"Output directory is not empty: {args.output}")
+
+    library = SyntheticLibrary(output_path=args.output, albums=args.albums, seed=args.seed, tracks=args.tracks)
+    library.generate()
+    library.save_report()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,17 +2,28 @@
 """
 Inventory script for Esoteric DSD Library
 Compares source (SACD ISOs) with target (extracted DSDs)
+
+Usage:
+    python inventory-esoteric.py
+    python inventory-esoteric.py --source /path/to/00_esoteric --target /path/to/esoteric --output inventory.json
+    python inventory-esoteric.py --profile       # Print slowest albums/phases
+    python inventory-esoteric.py --metrics-dir   # Prometheus textfile for node_exporter
 """
 
 import os
 import re
+import argparse
 from pathlib import Path
 from collections import defaultdict
 import json
 
+from run_metrics import profiler, DEFAULT_TEXTFILE_DIR
+
 SOURCE_PATH = Path("/Volumes/Expansion/00_DSD/00_esoteric")
 TARGET_PATH = Path("/Volumes/Untitled/esoteric")
+OUTPUT_PATH = Path("/Users/x/src/music-streaming/scripts/esoteric-inventory.json")
 
+@profiler.timed("walk")
 def count_isos(folder: Path) -> list:
     """Count ISO files recursively up to depth 2"""
     isos = []
@@ -23,6 +34,7 @@ def count_isos(folder: Path) -> list:
             isos.append(item)
     return isos
 
+@profiler.timed("walk")
 def count_dsf_folders(folder: Path) -> list:
     """Find folders containing DSF files"""
     dsf_folders = []
@@ -32,6 +44,7 @@ def count_dsf_folders(folder: Path) -> list:
             dsf_folders.append(parent)
     return dsf_folders
 
+@profiler.timed("walk")
 def find_disc_folders(album_path: Path) -> list:
     """Find disc folders (Disk1, disc 1, CD1, etc.)"""
     disc_folders = []
@@ -51,6 +64,7 @@ def find_disc_folders(album_path: Path) -> list:
     
     return disc_folders
 
+@profiler.timed("regex")
 def get_expected_discs(folder_name: str) -> int:
     """Parse expected disc count from folder name"""
     # Match patterns like (Esoteric, 2SACD), (Esoteric, 14SACD), (2 discs)
@@ -109,6 +123,7 @@ def analyze_album(source_folder: Path, target_folder: Path) -> dict:
     
     return result
 
+@profiler.timed("walk")
 def analyze_single_album(source: Path, target: Path) -> dict:
     """Analyze a single album (not a box set)"""
     result = {
@@ -159,9 +174,22 @@ def analyze_single_album(source: Path, target: Path) -> dict:
     return result
 
 def main():
+    parser = argparse.ArgumentParser(description="Inventory Esoteric DSD library (source ISOs vs extracted DSDs)")
+    parser.add_argument("--source", type=Path, default=SOURCE_PATH, help=f"Source path. Default: {SOURCE_PATH}")
+    parser.add_argument("--target", type=Path, default=TARGET_PATH, help=f"Target path. Default: {TARGET_PATH}")
+    parser.add_argument("--output", type=Path, default=OUTPUT_PATH, help=f"JSON output. Default: {OUTPUT_PATH}")
+    parser.add_argument("--profile", action="store_true", help="Print the slowest albums and phases")
+    parser.add_argument("--metrics-dir", type=str, nargs="?", const=DEFAULT_TEXTFILE_DIR,
+                        help=f"Write Prometheus textfile for node_exporter. Default dir: {DEFAULT_TEXTFILE_DIR}")
+    args = parser.parse_args()
+    source_path = args.source
+    target_path = args.target
+    if args.profile or args.metrics_dir:
+        profiler.enable("inventory_esoteric")
+
     inventory = {
-        "source_path": str(SOURCE_PATH),
-        "target_path": str(TARGET_PATH),
+        "source_path": str(source_path),
+        "target_path": str(target_path),
         "albums": [],
         "summary": {
             "total_albums": 0,
@@ -176,7 +204,7 @@ def main():
     total_isos = 0
     total_extracted = 0
     
-    for source_album in sorted(SOURCE_PATH.iterdir()):
+    for source_album in sorted(source_path.iterdir()):
         if not source_album.is_dir() or source_album.name.startswith('.'):
             continue
         if source_album.name == 'README.md':
@@ -188,17 +216,18 @@ def main():
         target_name = re.sub(r'\(Esoteric,\s*(\d+)?x?(SACD|DSD)\)', r'(Esoteric, DSDe)', target_name)
         target_name = re.sub(r'\(Esoteric,\s*DSD\)', r'(Esoteric, DSD)', target_name)  # Keep DSD as-is for some
         
-        target_album = TARGET_PATH / target_name
+        target_album = target_path / target_name
         
         # Try to find if exact name doesn't match
         if not target_album.exists():
             base_name = source_album.name.split("(Esoteric")[0].strip()
-            for t in TARGET_PATH.iterdir():
+            for t in target_path.iterdir():
                 if base_name in t.name:
                     target_album = t
                     break
         
-        analysis = analyze_album(source_album, target_album)
+        with profiler.album(source_album.name):
+            analysis = analyze_album(source_album, target_album)
         inventory["albums"].append(analysis)
         
         # Count ISOs and extractions
@@ -223,8 +252,8 @@ def main():
     print("=" * 70)
     print("ESOTERIC LIBRARY INVENTORY")
     print("=" * 70)
-    print(f"Source: {SOURCE_PATH}")
-    print(f"Target: {TARGET_PATH}")
+    print(f"Source: {source_path}")
+    print(f"Target: {target_path}")
     print()
     
     # Print albums with issues
@@ -270,9 +299,15 @@ def main():
     print(f"Missing extractions: {total_isos - total_extracted}")
     
     # Save JSON
-    with open("/Users/x/src/music-streaming/scripts/esoteric-inventory.json", "w") as f:
+    with open(args.output, "w") as f:
         json.dump(inventory, f, indent=2)
-    print(f"\nJSON saved to: /Users/x/src/music-streaming/scripts/esoteric-inventory.json")
+    print(f"\nJSON saved to: {args.output}")
+
+    profiler.disable()
+    if args.metrics_dir:
+        profiler.write_textfile(args.metrics_dir)
+    if args.profile:
+        profiler.print_profile()
 
 if __name__ == "__main__":
     main()
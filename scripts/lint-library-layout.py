@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Library Layout Linter
+
+Checks folder naming conventions on every genre root in one walk per root:
+Artist/Album (Year)/ with zero-padded CD01 subfolders for the CD rips,
+Album (Esoteric, DSDe)/Disk1 for the esoteric trees, no (2CD)/(Single)
+suffixes, no ", Disc X" album names, no leftover SACD markers.
+
+Rules are declarative (JSON policy, see --write-default-policy). All rules for
+a layout and depth are compiled into one combined regex, so each folder name
+is matched once no matter how many rules there are. Violations are written as
+JSON with suggested fixes.
+
+Incremental mode keeps a state file with each directory's mtime; a directory
+whose mtime is unchanged has the same entries, so its cached results are reused
+and only changed directories are read again.
+
+Policy:
+    roots    - [{"path": ..., "layout": ...}]
+    layouts  - {"music": {"max_depth": 3}, ...} (depth 1 = folders directly under the root)
+    rules    - name, layouts, depths (omit for all), type (forbid | require),
+               pattern, message, fixes ([[pattern, replacement], ...] tried in order)
+
+Usage:
+    python lint-library-layout.py                           # Full check of all roots
+    python lint-library-layout.py --incremental             # Re-check changed dirs only
+    python lint-library-layout.py --root /mnt/nas/CD_RIP=music
+    python lint-library-layout.py --write-default-policy layout-policy.json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+from pathlib import Path
+from datetime import datetime
+from typing import Optional
+
+from run_metrics import profiler, DEFAULT_TEXTFILE_DIR
+
+STATE_NAME = "layout-lint-state.json"
+
+# Disc-like folder names: CD1, cd 02, Disc 3, disk4
+DISC_LIKE = r"(?i:cd|disc|disk)\s*\d+"
+
+DEFAULT_POLICY = {
+    "roots": [
+        {"path": "/mnt/nas/music/metal", "layout": "music"},
+        {"path": "/mnt/nas/music/exyu", "layout": "music"},
+        {"path": "/mnt/nas/music/classical", "layout": "music"},
+        {"path": "/mnt/nas/music/jazz", "layout": "music"},
+        {"path": "/mnt/nas/esoteric", "layout": "esoteric"},
+        # Nested in classical/, which skips it since it is a root of its own
+        {"path": "/mnt/nas/music/classical/esoteric-flac", "layout": "esoteric-flac"},
+    ],
+    "layouts": {
+        "music": {"max_depth": 3},
+        "esoteric": {"max_depth": 4},
+        "esoteric-flac": {"max_depth": 4},
+    },
+    "rules": [
+        {
+            "name": "artist_album_combined",
+            "layouts": ["music"], "depths": [1], "type": "forbid",
+            "pattern": r"^.+ - \d{4} .+$",
+            "message": "Old 'Artist - YYYY Album' folder, expected Artist/Album (Year)",
+            "fixes": [[r"^(.+) - (\d{4}) (.+?)(?:\s*\((?:\d*CD|Single)\))?$", r"\1/\3 (\2)"]],
+        },
+        {
+            "name": "album_without_artist",
+            "layouts": ["music"], "depths": [1], "type": "forbid",
+            "pattern": r"^(?!.+ - \d{4} ).+ \(\d{4}\)$",
+            "message": "Album folder directly under the genre root, expected Artist/Album (Year)",
+        },
+        {
+            "name": "album_year",
+            "layouts": ["music"], "depths": [2], "type": "require",
+            "pattern": r"^.+ \(\d{4}\)(?:\s*\((?:\d*CD|Single)\))?$",
+            "message": "Album folder must end with (Year)",
+            "fixes": [[r"^(\d{4}) (.+)$", r"\2 (\1)"], [r"^(.+?) - (\d{4})$", r"\1 (\2)"]],
+        },
+        {
+            "name": "disc_count_suffix",
+            "layouts": ["music"], "depths": [2], "type": "forbid",
+            "pattern": r"\s*\((?:\d*CD|Single)\)",
+            "message": "No disc count suffixes like (2CD) or (Single)",
+            "fixes": [[r"\s*\((?:\d*CD|Single)\)", ""]],
+        },
+        {
+            "name": "disc_in_album_name",
+            "layouts": ["music"], "depths": [2], "type": "forbid",
+            "pattern": r",\s*(?i:disc|cd)\s*\d+",
+            "message": "Album name contains ', Disc X'; discs belong in CD01/CD02 subfolders",
+            "fixes": [[r",\s*(?i:disc|cd)\s*\d+", ""]],
+        },
+        {
+            "name": "disc_folder_name",
+            "layouts": ["music"], "depths": [3], "type": "require",
+            "pattern": rf"^CD\d{{2}}$|^(?!{DISC_LIKE}$)",
+            "message": "Disc folders must be zero-padded CD01, CD02, ...",
+            "fixes": [[r"^(?i:cd|disc|disk)\s*0*([1-9])$", r"CD0\1"], [r"^(?i:cd|disc|disk)\s*(\d{2})$", r"CD\1"]],
+        },
+        {
+            "name": "esoteric_album_marker",
+            "layouts": ["esoteric"], "depths": [1], "type": "require",
+            "pattern": r"\(Esoteric, DSDe?\)$",
+            "message": "Esoteric DSD album must end with (Esoteric, DSDe) or (Esoteric, DSD)",
+            "fixes": [[r"\(Esoteric,\s*\d*x?SACD\)$", "(Esoteric, DSDe)"]],
+        },
+        {
+            "name": "esoteric_flac_album_marker",
+            "layouts": ["esoteric-flac"], "depths": [1], "type": "require",
+            "pattern": r"\(Esoteric\)$",
+            "message": "Esoteric FLAC album must end with (Esoteric)",
+            "fixes": [[r"\(Esoteric,\s*[^)]*\)$", "(Esoteric)"]],
+        },
+        {
+            "name": "sacd_marker",
+            "layouts": ["esoteric", "esoteric-flac"], "type": "forbid",
+            "pattern": r"\(Esoteric,\s*\d*x?SACD\)",
+            "message": "Source SACD marker left in extracted folder name",
+            "fixes": [[r"\(Esoteric,\s*\d*x?SACD\)", "(Esoteric, DSDe)"]],
+        },
+        {
+            "name": "esoteric_disc_folder_name",
+            "layouts": ["esoteric", "esoteric-flac"], "depths": [2, 3, 4], "type": "require",
+            "pattern": rf"^Disk[1-9]\d*$|^(?!{DISC_LIKE}$)(?!.*\((?i:disc)\s*\d+\)$)",
+            "message": "Disc folders must be Disk1, Disk2, ... (validate-esoteric.py --fix renames them)",
+            "fixes": [[r"^(?i:cd|disc|disk)\s*0*(\d+)$", r"Disk\1"], [r"^.*\((?i:disc)\s*0*(\d+)\)$", r"Disk\1"]],
+        },
+    ],
+}
+
+
+def policy_hash(policy: dict) -> str:
+    """Hash of what decides a folder's violations; roots are left out so
+    switching --root does not drop the cache of the other roots"""
+    rules = {"layouts": policy["layouts"], "rules": policy["rules"]}
+    return hashlib.sha1(json.dumps(rules, sort_keys=True).encode()).hexdigest()
+
+
+class LayoutLinter:
+    def __init__(self, policy: dict, state_path: Optional[Path] = None):
+        self.policy = policy
+        self.state_path = state_path
+        self.rules = policy["rules"]
+        self.layouts = policy["layouts"]
+        self._matchers = {}
+        self.state = {}
+        self.new_state = {}
+
+        self.report = {
+            "generated": datetime.now().isoformat(),
+            "incremental": state_path is not None,
+            "roots": [],
+            "violations": [],
+            "summary": {
+                "roots_checked": 0,
+                "dirs_checked": 0,
+                "dirs_read": 0,
+                "dirs_cached": 0,
+                "violations": 0,
+                "with_suggested_fix": 0,
+                "seconds": 0.0,
+            },
+            "by_rule": {r["name"]: 0 for r in self.rules},
+        }
+
+    def matcher(self, layout: str, depth: int) -> tuple:
+        """One regex per (layout, depth) holding every applicable rule.
+
+        Each rule sits in an optional lookahead anchored at the start of the
+        name, so a single match() call sets the group of every rule whose
+        pattern occurs in the name.
+        """
+        key = (layout, depth)
+        if key not in self._matchers:
+            rules = [(i, r) for i, r in enumerate(self.rules)
+                     if layout in r.get("layouts", [layout]) and depth in r.get("depths", [depth])]
+            if rules:
+                # (?s) so names with odd characters never stop a lookahead early
+                combined = "".join(f"(?=(?P<r{i}>{r['pattern']}))?" if r["pattern"].startswith("^")
+                                   else f"(?=.*?(?P<r{i}>{r['pattern']}))?"
+                                   for i, r in rules)
+                self._matchers[key] = (re.compile(f"(?s){combined}"), rules)
+            else:
+                self._matchers[key] = (None, [])
+        return self._matchers[key]
+
+    def suggest(self, rule: dict, name: str) -> Optional[str]:
+        for pattern, replacement in rule.get("fixes", []):
+            fixed, count = re.subn(pattern, replacement, name)
+            if count:
+                return re.sub(r"\s{2,}", " ", fixed).strip()
+        return None
+
+    @profiler.timed("match")
+    def lint_name(self, root: Path, layout: str, parent: str, name: str, depth: int) -> list:
+        """All rule violations for one folder name"""
+        regex, rules = self.matcher(layout, depth)
+        if regex is None:
+            return []
+        m = regex.match(name)
+        violations = []
+        for i, rule in rules:
+            matched = m.group(f"r{i}") is not None
+            if matched == (rule["type"] == "forbid"):
+                suggestion = self.suggest(rule, name)
+                path = os.path.join(parent, name)
+                violations.append({
+                    "path": path,
+                    "relative": os.path.relpath(path, root),
+                    "root": str(root),
+                    "rule": rule["name"],
+                    "message": rule["message"],
+                    "name": name,
+                    "suggested_name": suggestion,
+                    "suggested_path": os.path.join(parent, suggestion) if suggestion else None,
+                })
+        return violations
+
+    @profiler.timed("readdir")
+    def read_dir(self, folder: str) -> list:
+        """Visible subdirectory names of a folder"""
+        names = []
+        with os.scandir(folder) as it:
+            for entry in it:
+                if not entry.name.startswith(".") and entry.is_dir(follow_symlinks=False):
+                    names.append(entry.name)
+        return sorted(names)
+
+    def lint_root(self, root: Path, layout: str, nested_roots: set = frozenset()):
+        """Walk one root once, up to the layout's max depth.
+
+        Folders in nested_roots are configured roots of their own and are
+        left to their own layout.
+        """
+        max_depth = self.layouts.get(layout, {}).get("max_depth", 3)
+        stack = [(str(root), 0)]
+        while stack:
+            folder, depth = stack.pop()
+            if depth >= max_depth:
+                continue
+            try:
+                mtime_ns = os.stat(folder).st_mtime_ns
+            except OSError as e:
+                print(f"  [ERROR] {folder}: {e}")
+                continue
+            self.report["summary"]["dirs_checked"] += 1
+            cached = self.state.get(folder)
+            if (cached and cached["mtime_ns"] == mtime_ns
+                    and cached.get("layout") == layout and cached.get("depth") == depth):
+                # Same mtime, same entries: reuse names and their violations
+                subdirs = cached["subdirs"]
+                violations = cached["violations"]
+                self.report["summary"]["dirs_cached"] += 1
+            else:
+                try:
+                    subdirs = self.read_dir(folder)
+                except OSError as e:
+                    print(f"  [ERROR] {folder}: {e}")
+                    continue
+                self.report["summary"]["dirs_read"] += 1
+                violations = []
+                for name in subdirs:
+                    violations.extend(self.lint_name(root, layout, folder, name, depth + 1))
+            self.new_state[folder] = {"mtime_ns": mtime_ns, "layout": layout, "depth": depth,
+                                      "subdirs": subdirs, "violations": violations}
+            for v in violations:
+                if v["path"] not in nested_roots:
+                    self.add_violation(v)
+            for name in subdirs:
+                path = os.path.join(folder, name)
+                if path not in nested_roots:
+                    stack.append((path, depth + 1))
+
+    def add_violation(self, violation: dict):
+        self.report["violations"].append(violation)
+        self.report["summary"]["violations"] += 1
+        self.report["by_rule"][violation["rule"]] = self.report["by_rule"].get(violation["rule"], 0) + 1
+        if violation["suggested_name"]:
+            self.report["summary"]["with_suggested_fix"] += 1
+
+    def load_state(self):
+        """Cached dirs from the previous run (dropped when the policy changed)"""
+        if not self.state_path or not self.state_path.exists():
+            return
+        with open(self.state_path) as f:
+            state = json.load(f)
+        if state.get("policy_hash") == policy_hash(self.policy):
+            self.state = state["dirs"]
+        else:
+            print("Policy changed since last run, doing a full check")
+
+    def save_state(self):
+        """Merge this run's dirs into the state; other roots keep their cache"""
+        if not self.state_path:
+            return
+        walked = [r["path"] for r in self.report["roots"]]
+        dirs = {folder: entry for folder, entry in self.state.items()
+                if not any(folder == r or folder.startswith(r + os.sep) for r in walked)}
+        dirs.update(self.new_state)
+        tmp = self.state_path.with_name(self.state_path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"policy_hash": policy_hash(self.policy), "dirs": dirs}, f, ensure_ascii=False)
+        os.replace(tmp, self.state_path)
+
+    def run(self):
+        """Lint every configured root"""
+        start = time.perf_counter()
+        self.load_state()
+        print(f"Mode: {'INCREMENTAL' if self.state_path else 'FULL'}")
+        print("=" * 60)
+        root_paths = {str(Path(r["path"])) for r in self.policy["roots"]}
+        for root_cfg in self.policy["roots"]:
+            root = Path(root_cfg["path"])
+            layout = root_cfg["layout"]
+            if not root.is_dir():
+                print(f"[SKIP] Root does not exist: {root}")
+                continue
+            before = self.report["summary"]["violations"]
+            nested = {p for p in root_paths if p.startswith(str(root) + os.sep)}
+            with profiler.album(str(root)):
+                self.lint_root(root, layout, nested)
+            found = self.report["summary"]["violations"] - before
+            print(f"[ROOT] {root} ({layout}): {found} violation(s)")
+            self.report["roots"].append({"path": str(root), "layout": layout, "violations": found})
+            self.report["summary"]["roots_checked"] += 1
+        self.report["violations"].sort(key=lambda v: v["path"])
+        self.report["summary"]["seconds"] = round(time.perf_counter() - start, 3)
+        self.save_state()
+        self.print_summary()
+
+    def print_summary(self):
+        """Print violations and totals"""
+        if self.report["violations"]:
+            print("\nVIOLATIONS:")
+            print("-" * 60)
+        for v in self.report["violations"]:
+            print(f"[{v['rule'].upper()}] {v['path']}")
+            if v["suggested_name"]:
+                print(f"  -> {v['suggested_name']}")
+        print("\n" + "=" * 60)
+        print("SUMMARY")
+        print("=" * 60)
+        s = self.report["summary"]
+        print(f"Roots checked:         {s['roots_checked']}")
+        print(f"Dirs checked:          {s['dirs_checked']} ({s['dirs_read']} read, {s['dirs_cached']} cached)")
+        print(f"Violations:            {s['violations']} ({s['with_suggested_fix']} with suggested fix)")
+        for name, count in self.report["by_rule"].items():
+            if count:
+                print(f"  {name + ':':30} {count}")
+        print(f"Time:                  {s['seconds']}s")
+
+    def save_report(self, output_dir: Path):
+        """Save report to JSON"""
+        json_path = output_dir / "layout-lint-report.json"
+        with open(json_path, "w") as f:
+            json.dump(self.report, f, indent=2, ensure_ascii=False)
+        print(f"\nJSON report saved: {json_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check folder naming conventions on all library roots")
+    parser.add_argument("--policy", type=str, help="Policy JSON file (default: built-in rules)")
+    parser.add_argument("--write-default-policy", type=str, metavar="FILE", help="Write the built-in policy and exit")
+    parser.add_argument("--root", action="append", metavar="PATH=LAYOUT",
+                        help="Override policy roots, e.g. /mnt/nas/CD_RIP=music (repeatable)")
+    parser.add_argument("--incremental", action="store_true", help="Only re-read directories changed since last run")
+    parser.add_argument("--state", type=Path, help=f"Incremental state file. Default: <report-dir>/{STATE_NAME}")
+    parser.add_argument("--report-dir", type=str, default=".", help="Directory to save reports")
+    parser.add_argument("--profile", action="store_true", help="Print the slowest roots and phases")
+    parser.add_argument("--metrics-dir", type=str, nargs="?", const=DEFAULT_TEXTFILE_DIR,
+                        help=f"Write Prometheus textfile for node_exporter. Default dir: {DEFAULT_TEXTFILE_DIR}")
+
+    args = parser.parse_args()
+    if args.write_default_policy:
+        with open(args.write_default_policy, "w") as f:
+            json.dump(DEFAULT_POLICY, f, indent=2)
+        print(f"Default policy written: {args.write_default_policy}")
+        return
+
+    policy = DEFAULT_POLICY
+    if args.policy:
+        with open(args.policy) as f:
+            policy = json.load(f)
+    if args.root:
+        roots = []
+        for item in args.root:
+            path, _, layout = item.rpartition("=")
+            if not path or layout not in policy["layouts"]:
+                parser.error(f"--root must be PATH=LAYOUT with layout one of: {', '.join(policy['layouts'])}")
+            roots.append({"path": path, "layout": layout})
+        policy = dict(policy, roots=roots)
+
+    state = None
+    if args.incremental:
+        state = args.state or Path(args.report_dir) / STATE_NAME
+
+    if args.profile or args.metrics_dir:
+        profiler.enable("lint_library_layout")
+    linter = LayoutLinter(policy=policy, state_path=state)
+    linter.run()
+    linter.save_report(Path(args.report_dir))
+    profiler.disable()
+    if args.metrics_dir:
+        profiler.write_textfile(args.metrics_dir)
+    if args.profile:
+        profiler.print_profile()
+
+    if linter.report["summary"]["violations"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+FLAC Recompression Pass
+
+Re-encodes FLAC files at a higher compression level across a process pool.
+A file is replaced (atomically, same directory) only when the decoded audio
+MD5 is unchanged, all tags and pictures survived, and the saving exceeds the
+threshold. A per-file ledger lets later runs skip files that were already
+optimised; the summary reports bytes reclaimed per genre folder.
+
+Dry-run (default) encodes to a temp file and reports the possible saving
+without replacing anything.
+
+Usage:
+    python recompress-flac.py                                  # Dry-run, default roots
+    python recompress-flac.py --apply                          # Replace files
+    python recompress-flac.py --root /mnt/nas/music/metal --level 8 --workers 4 --apply
+    python recompress-flac.py --root /Volumes/Untitled/esoteric-flac --min-saving 2 --apply
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import subprocess
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional
+
+from run_metrics import profiler, DEFAULT_TEXTFILE_DIR
+
+DEFAULT_ROOTS = ["/mnt/nas/music/metal", "/mnt/nas/music/exyu", "/mnt/nas/music/classical/esoteric-flac"]
+DEFAULT_LEVEL = 8
+DEFAULT_MIN_SAVING_PERCENT = 1.0
+DEFAULT_WORKERS = os.cpu_count() or 4
+LEDGER_NAME = "flac-recompress-ledger.json"
+
+# Flush the ledger every N results so an interrupted run loses little work
+LEDGER_FLUSH_EVERY = 50
+HASH_BUFFER_SIZE = 1024 * 1024
+ZERO_MD5 = "0" * 32
+
+
+def format_size(num_bytes: int) -> str:
+    """Human readable size (GiB/MiB)"""
+    if abs(num_bytes) >= 1024 ** 3:
+        return f"{num_bytes / 1024 ** 3:.2f} GiB"
+    return f"{num_bytes / 1024 ** 2:.1f} MiB"
+
+
+def streaminfo_md5(path: str) -> Optional[str]:
+    """Audio MD5 stored in STREAMINFO (None if not a FLAC file)"""
+    with open(path, "rb") as f:
+        head = f.read(10)
+        # Skip an ID3v2 tag some rippers prepend
+        if head[:3] == b"ID3":
+            size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+            f.seek(10 + size)
+        else:
+            f.seek(0)
+        if f.read(4) != b"fLaC":
+            return None
+        block_header = f.read(4)
+        if len(block_header) < 4 or block_header[0] & 0x7F != 0:
+            return None
+        streaminfo = f.read(34)
+        if len(streaminfo) < 34:
+            return None
+        return streaminfo[18:34].hex()
+
+
+def has_id3v2(path: str) -> bool:
+    """True if an ID3v2 tag is prepended to the FLAC stream"""
+    with open(path, "rb") as f:
+        return f.read(3) == b"ID3"
+
+
+def decoded_md5(path: str) -> str:
+    """MD5 of the decoded PCM, for files whose STREAMINFO MD5 was never set"""
+    digest = hashlib.md5()
+    proc = subprocess.Popen(["flac", "--decode", "--stdout", "--silent", "--force-raw-format",
+                             "--endian=little", "--sign=signed", path],
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    for chunk in iter(lambda: proc.stdout.read(HASH_BUFFER_SIZE), b""):
+        digest.update(chunk)
+    proc.stdout.close()
+    if proc.wait() != 0:
+        raise RuntimeError(f"decode failed: {path}")
+    return digest.hexdigest()
+
+
+def metadata_fingerprint(path: str) -> str:
+    """Tags plus picture blocks, without block numbers/offsets that may move"""
+    tags = subprocess.run(["metaflac", "--export-tags-to=-", path],
+                          capture_output=True, check=True).stdout
+    pictures = subprocess.run(["metaflac", "--list", "--block-type=PICTURE", path],
+                              capture_output=True, check=True).stdout
+    kept = [line for line in pictures.splitlines()
+            if not line.startswith(b"METADATA block #") and not line.strip().startswith(b"is last:")]
+    return hashlib.sha1(tags + b"\n".join(kept)).hexdigest()
+
+
+def recompress_file(path: str, level: int, min_saving_percent: float, apply: bool) -> dict:
+    """Re-encode one file (runs in a worker process)"""
+    start = time.perf_counter()
+    result = {"path": path, "status": "failed", "old_size": 0, "new_size": 0, "error": None}
+    tmp = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.recompress.tmp")
+    try:
+        st = os.stat(path)
+        result["old_size"] = st.st_size
+        old_md5 = streaminfo_md5(path)
+        if old_md5 is None:
+            result["status"] = "not_flac"
+            return result
+        # flac drops a prepended ID3v2 tag and metaflac never reads it,
+        # so tags kept only there would vanish unnoticed
+        if has_id3v2(path):
+            raise RuntimeError("ID3v2 tag before the FLAC stream would be lost; move the tags to Vorbis comments first")
+
+        proc = subprocess.run(["flac", f"-{level}", "--verify", "--silent", "--force",
+                               "--output-name", tmp, path], capture_output=True)
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.decode(errors="replace").strip() or "flac failed")
+
+        # --verify already checks the encoder; compare the audio against the original too
+        new_md5 = streaminfo_md5(tmp)
+        if old_md5 == ZERO_MD5:
+            if decoded_md5(path) != decoded_md5(tmp):
+                raise RuntimeError("decoded audio MD5 changed")
+        elif new_md5 != old_md5:
+            raise RuntimeError(f"audio MD5 changed ({old_md5} -> {new_md5})")
+        if metadata_fingerprint(path) != metadata_fingerprint(tmp):
+            raise RuntimeError("tags or pictures changed")
+
+        result["new_size"] = os.path.getsize(tmp)
+        saving = result["old_size"] - result["new_size"]
+        if saving * 100 < result["old_size"] * min_saving_percent:
+            result["status"] = "kept"
+            return result
+
+        if apply:
+            # A tag edit or re-rip during the encode would be lost by the replace
+            now = os.stat(path)
+            if (now.st_size, now.st_mtime_ns) != (st.st_size, st.st_mtime_ns):
+                raise RuntimeError("changed during encode")
+            shutil.copymode(path, tmp)
+            try:
+                os.chown(tmp, st.st_uid, st.st_gid)
+            except PermissionError:
+                pass
+            os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+            os.replace(tmp, path)
+            st = os.stat(path)
+        result["status"] = "replaced"
+        result["mtime_ns"] = st.st_mtime_ns
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        result["seconds"] = time.perf_counter() - start
+    return result
+
+
+class FlacRecompressor:
+    def __init__(self, roots: list, ledger_path: Path, dry_run: bool = True, level: int = DEFAULT_LEVEL,
+                 min_saving_percent: float = DEFAULT_MIN_SAVING_PERCENT, workers: int = DEFAULT_WORKERS):
+        self.roots = [Path(r) for r in roots]
+        self.ledger_path = ledger_path
+        self.dry_run = dry_run
+        self.level = level
+        self.min_saving_percent = min_saving_percent
+        self.workers = workers
+        self.ledger = self.load_ledger()
+
+        self.report = {
+            "generated": datetime.now().isoformat(),
+            "roots": [str(r) for r in self.roots],
+            "dry_run": dry_run,
+            "level": level,
+            "min_saving_percent": min_saving_percent,
+            "genres": {},
+            "failed": [],
+            "summary": {
+                "files_found": 0,
+                "files_skipped": 0,
+                "files_replaced": 0,
+                "files_kept": 0,
+                "files_failed": 0,
+                "bytes_before": 0,
+                "bytes_reclaimed": 0,
+            }
+        }
+
+    def load_ledger(self) -> dict:
+        if self.ledger_path.exists():
+            with open(self.ledger_path) as f:
+                return json.load(f)
+        return {}
+
+    def save_ledger(self):
+        """Atomic write so an interrupted run never leaves a broken ledger"""
+        if self.dry_run:
+            return
+        tmp = self.ledger_path.with_name(self.ledger_path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.ledger, f, ensure_ascii=False)
+        os.replace(tmp, self.ledger_path)
+
+    def is_optimised(self, path: str, st: os.stat_result) -> bool:
+        """Ledger hit: same size and mtime, already at this level or higher"""
+        entry = self.ledger.get(path)
+        return bool(entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns
+                    and entry["level"] >= self.level)
+
+    @profiler.timed("walk")
+    def find_flacs(self, root: Path) -> list:
+        """All .flac files below root (one scandir per directory)"""
+        found = []
+        stack = [str(root)]
+        while stack:
+            folder = stack.pop()
+            try:
+                with os.scandir(folder) as it:
+                    for entry in it:
+                        if entry.name.startswith("."):
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.name.lower().endswith(".flac") and entry.is_file(follow_symlinks=False):
+                            found.append((entry.path, entry.stat(follow_symlinks=False)))
+            except OSError as e:
+                print(f"[ERROR] Cannot read {folder}: {e}")
+        return sorted(found)
+
+    def genre_stats(self, genre: str) -> dict:
+        return self.report["genres"].setdefault(genre, {
+            "files": 0, "replaced": 0, "bytes_before": 0, "bytes_reclaimed": 0,
+        })
+
+    def record(self, genre: str, result: dict):
+        """Fold one worker result into the report and ledger"""
+        stats = self.genre_stats(genre)
+        s = self.report["summary"]
+        status = result["status"]
+        name = result["path"]
+        if result["error"]:
+            print(f"  [ERROR] {name}: {result['error']}")
+            self.report["failed"].append({"path": result["path"], "error": result["error"]})
+            s["files_failed"] += 1
+            return
+        if status == "not_flac":
+            print(f"  [SKIP] Not a FLAC stream: {name}")
+            return
+        saving = result["old_size"] - result["new_size"]
+        if status == "replaced":
+            tag = "DRY-RUN" if self.dry_run else "FIXED"
+            print(f"  [{tag}] {name}: {format_size(result['old_size'])} -> "
+                  f"{format_size(result['new_size'])} (-{saving * 100 / result['old_size']:.1f}%)")
+            stats["replaced"] += 1
+            stats["bytes_reclaimed"] += saving
+            s["files_replaced"] += 1
+            s["bytes_reclaimed"] += saving
+            size = result["new_size"]
+        else:
+            s["files_kept"] += 1
+            size = result["old_size"]
+        if not self.dry_run:
+            self.ledger[result["path"]] = {
+                "size": size,
+                "mtime_ns": result.get("mtime_ns") or os.stat(result["path"]).st_mtime_ns,
+                "level": self.level,
+                "result": status,
+                "saved": saving if status == "replaced" else 0,
+                "checked": datetime.now().isoformat(timespec="seconds"),
+            }
+
+    def run(self):
+        """Find, re-encode and summarise"""
+        print(f"Roots: {', '.join(str(r) for r in self.roots)}")
+        print(f"Level: -{self.level}, min saving: {self.min_saving_percent}%")
+        print(f"Workers: {self.workers}")
+        print(f"Mode: {'DRY-RUN' if self.dry_run else 'REPLACING'}")
+        print("=" * 60)
+
+        for tool in ("flac", "metaflac"):
+            if not shutil.which(tool):
+                print(f"ERROR: {tool} not found")
+                return
+
+        jobs = []
+        for root in self.roots:
+            if not root.exists():
+                print(f"[SKIP] Root does not exist: {root}")
+                continue
+            genre = root.name
+            for path, st in self.find_flacs(root):
+                self.report["summary"]["files_found"] += 1
+                stats = self.genre_stats(genre)
+                stats["files"] += 1
+                stats["bytes_before"] += st.st_size
+                self.report["summary"]["bytes_before"] += st.st_size
+                if self.is_optimised(path, st):
+                    self.report["summary"]["files_skipped"] += 1
+                    continue
+                jobs.append((genre, path))
+        print(f"{len(jobs)} files to check, {self.report['summary']['files_skipped']} already optimised")
+
+        profiler.set_workers(self.workers)
+        done = 0
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(recompress_file, path, self.level, self.min_saving_percent,
+                                   not self.dry_run): genre for genre, path in jobs}
+            for future in as_completed(futures):
+                result = future.result()
+                profiler.add_worker_time(result["seconds"])
+                profiler.count("bytes_read", result["old_size"])
+                profiler.count("bytes_written", result["new_size"])
+                self.record(futures[future], result)
+                done += 1
+                if done % LEDGER_FLUSH_EVERY == 0:
+                    self.save_ledger()
+        self.save_ledger()
+        self.print_summary()
+
+    def print_summary(self):
+        """Print per-genre savings"""
+        print("\n" + "=" * 60)
+        print("SUMMARY")
+        print("=" * 60)
+        verb = "Reclaimable" if self.dry_run else "Reclaimed"
+        for genre, g in sorted(self.report["genres"].items()):
+            print(f"{genre:20} {g['files']:7d} files  {g['replaced']:6d} re-encoded  "
+                  f"{verb.lower()}: {format_size(g['bytes_reclaimed'])} of {format_size(g['bytes_before'])}")
+        s = self.report["summary"]
+        print(f"\nFiles found:           {s['files_found']}")
+        print(f"Already optimised:     {s['files_skipped']}")
+        print(f"Re-encoded:            {s['files_replaced']}")
+        print(f"Below threshold:       {s['files_kept']}")
+        print(f"Failed:                {s['files_failed']}")
+        print(f"{verb}:{' ' * (22 - len(verb))}{format_size(s['bytes_reclaimed'])}")
+
+    def save_report(self, output_dir: Path):
+        """Save report to JSON and text files"""
+        json_path = output_dir / "flac-recompress-report.json"
+        with open(json_path, "w") as f:
+            json.dump(self.report, f, indent=2, ensure_ascii=False)
+        print(f"\nJSON report saved: {json_path}")
+
+        txt_path = output_dir / "flac-recompress-report.txt"
+        with open(txt_path, "w") as f:
+            f.write("# FLAC Recompression Report\n")
+            f.write(f"# Generated: {self.report['generated']}\n")
+            f.write(f"# Mode: {'DRY-RUN' if self.dry_run else 'APPLIED'}\n")
+            f.write(f"# Level: -{self.level}, min saving: {self.min_saving_percent}%\n")
+            f.write("=" * 60 + "\n\n")
+
+            f.write("## BYTES RECLAIMED PER GENRE\n\n")
+            for genre, g in sorted(self.report["genres"].items()):
+                f.write(f"{genre}: {format_size(g['bytes_reclaimed'])} "
+                        f"({g['replaced']} of {g['files']} files, {format_size(g['bytes_before'])} before)\n")
+            f.write("\n")
+
+            if self.report["failed"]:
+                f.write("## FAILED (left untouched)\n\n")
+                for item in self.report["failed"]:
+                    f.write(f"{item['path']}\n  {item['error']}\n")
+                f.write("\n")
+
+            f.write("## SUMMARY\n\n")
+            for key, value in self.report["summary"].items():
+                f.write(f"{key}: {value}\n")
+        print(f"Text report saved: {txt_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-encode FLAC files at a higher compression level")
+    parser.add_argument("--root", action="append", help=f"Genre folder (repeatable). Default: {' '.join(DEFAULT_ROOTS)}")
+    parser.add_argument("--level", type=int, default=DEFAULT_LEVEL, choices=range(0, 9),
+                        help=f"flac compression level. Default: {DEFAULT_LEVEL}")
+    parser.add_argument("--min-saving", type=float, default=DEFAULT_MIN_SAVING_PERCENT,
+                        help=f"Replace only when the file shrinks by at least this percent. Default: {DEFAULT_MIN_SAVING_PERCENT}")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help=f"Encoder processes. Default: {DEFAULT_WORKERS}")
+    parser.add_argument("--ledger", type=Path, help=f"Ledger file. Default: <report-dir>/{LEDGER_NAME}")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would be done")
+    parser.add_argument("--apply", action="store_true", help="Replace files (default is dry-run)")
+    parser.add_argument("--report-dir", type=str, default=".", help="Directory to save reports")
+    parser.add_argument("--profile", action="store_true", help="Print the slowest phases")
+    parser.add_argument("--metrics-dir", type=str, nargs="?", const=DEFAULT_TEXTFILE_DIR,
+                        help=f"Write Prometheus textfile for node_exporter. Default dir: {DEFAULT_TEXTFILE_DIR}")
+
+    args = parser.parse_args()
+    ledger = args.ledger or Path(args.report_dir) / LEDGER_NAME
+
+    if args.profile or args.metrics_dir:
+        profiler.enable("recompress_flac")
+    recompressor = FlacRecompressor(roots=args.root or DEFAULT_ROOTS, ledger_path=ledger, dry_run=not args.apply,
+                                    level=args.level, min_saving_percent=args.min_saving, workers=args.workers)
+    recompressor.run()
+    recompressor.save_report(Path(args.report_dir))
+    profiler.disable()
+    if args.metrics_dir:
+        profiler.write_textfile(args.metrics_dir)
+    if args.profile:
+        profiler.print_profile()
+
+
+if __name__ == "__main__":
+    main()
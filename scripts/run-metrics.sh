@@ -0,0 +1,135 @@
+#!/bin/bash
+# Run metrics shared by the shell scripts (see run_metrics.py for the Python side)
+#
+# Usage (inside a script):
+#     METRICS_JOB="convert_dsd_to_flac"
+#     source "$(dirname "$0")/run-metrics.sh"
+#     RUN_START=$(now)
+#     record phase copy "$(elapsed "$start")"
+#     write_metrics
+#
+# METRICS_DIR=/var/lib/node_exporter/textfile_collector writes a Prometheus
+# textfile, PROFILE=1 prints the slowest discs and phases. With neither set,
+# record is a no-op and no temp file is created.
+
+METRICS_JOB="${METRICS_JOB:-$(basename "$0" .sh | tr '-' '_')}"
+METRICS_DIR="${METRICS_DIR:-}"
+PROFILE="${PROFILE:-}"
+METRICS_TMP=""
+METRICS_STAMP=""
+RUN_START=""
+
+if [ -n "$METRICS_DIR" ] || [ -n "$PROFILE" ]; then
+    METRICS_TMP=$(mktemp -t "$METRICS_JOB.XXXXXX")
+    METRICS_STAMP="$METRICS_TMP.stamp"
+    trap 'rm -f "$METRICS_TMP" "$METRICS_STAMP"' EXIT
+fi
+
+now() {
+    # EPOCHREALTIME needs bash 5; macOS /bin/bash 3.2 falls back to whole seconds
+    if [ -n "${EPOCHREALTIME:-}" ]; then
+        echo "${EPOCHREALTIME/,/.}"
+    else
+        date +%s
+    fi
+}
+
+elapsed() {
+    awk -v a="$1" -v b="$(now)" 'BEGIN { printf "%.3f", b - a }'
+}
+
+file_size() {
+    wc -c < "$1" | tr -d ' '
+}
+
+# mark_start: files changed after this point count as new for new_files_*
+mark_start() {
+    [ -n "$METRICS_TMP" ] || return 0
+    touch "$METRICS_STAMP"
+}
+
+# new_files <dir> <name glob>...: matching files under dir changed since mark_start
+new_files() {
+    local dir="$1"
+    shift
+    local args=() glob
+    for glob in "$@"; do
+        [ ${#args[@]} -eq 0 ] || args+=(-o)
+        args+=(-name "$glob")
+    done
+    find "$dir" -type f \( "${args[@]}" \) -newer "$METRICS_STAMP" -print0
+}
+
+# new_files_size <dir> <name glob>...: apparent size in bytes (not blocks)
+new_files_size() {
+    [ -n "$METRICS_TMP" ] || { echo 0; return 0; }
+    # Paths always contain the dir, so only wc's summary line is named "total"
+    new_files "$@" | xargs -0 wc -c 2>/dev/null | awk '$NF != "total" { s += $1 } END { printf "%d", s }'
+}
+
+# new_files_count <dir> <name glob>...
+new_files_count() {
+    [ -n "$METRICS_TMP" ] || { echo 0; return 0; }
+    new_files "$@" | tr -cd '\0' | wc -c | tr -d ' '
+}
+
+# record <kind> <name> <value>: kind is phase, disc, bytes_read, bytes_written or files
+record() {
+    [ -n "$METRICS_TMP" ] || return 0
+    printf '%s\t%s\t%s\n' "$1" "$2" "$3" >> "$METRICS_TMP"
+}
+
+write_metrics() {
+    [ -n "$METRICS_TMP" ] || return 0
+    local job="$METRICS_JOB"
+    local total
+    total=$(elapsed "$RUN_START")
+    if [ -n "$METRICS_DIR" ]; then
+        mkdir -p "$METRICS_DIR"
+        local prom="$METRICS_DIR/$job.prom"
+        awk -F'\t' -v job="$job" -v total="$total" -v ts="$(date +%s)" '
+            function esc(s) { gsub(/\\/, "\\\\", s); gsub(/"/, "\\\"", s); return s }
+            $1 == "phase" { phase[$2] += $3; calls[$2]++ }
+            $1 == "disc" { disc[$2] += $3 }
+            $1 == "bytes_read" { read += $3 }
+            $1 == "bytes_written" { written += $3 }
+            $1 == "files" { files[$2] += $3 }
+            END {
+                print "# HELP music_library_run_seconds Wall time of the last run."
+                print "# TYPE music_library_run_seconds gauge"
+                printf "music_library_run_seconds{job=\"%s\"} %s\n", job, total
+                print "# HELP music_library_run_timestamp_seconds Unix time the last run finished."
+                print "# TYPE music_library_run_timestamp_seconds gauge"
+                printf "music_library_run_timestamp_seconds{job=\"%s\"} %s\n", job, ts
+                print "# HELP music_library_phase_seconds Exclusive wall time per phase in the last run."
+                print "# TYPE music_library_phase_seconds gauge"
+                for (p in phase) printf "music_library_phase_seconds{job=\"%s\",phase=\"%s\"} %.3f\n", job, esc(p), phase[p]
+                print "# HELP music_library_phase_calls Number of times each phase ran in the last run."
+                print "# TYPE music_library_phase_calls gauge"
+                for (p in calls) printf "music_library_phase_calls{job=\"%s\",phase=\"%s\"} %d\n", job, esc(p), calls[p]
+                print "# HELP music_library_album_seconds Wall time per disc in the last run."
+                print "# TYPE music_library_album_seconds gauge"
+                for (d in disc) printf "music_library_album_seconds{job=\"%s\",album=\"%s\"} %.3f\n", job, esc(d), disc[d]
+                print "# HELP music_library_bytes Bytes read and written in the last run."
+                print "# TYPE music_library_bytes gauge"
+                printf "music_library_bytes{job=\"%s\",direction=\"read\"} %d\n", job, read
+                printf "music_library_bytes{job=\"%s\",direction=\"written\"} %d\n", job, written
+                print "# HELP music_library_files Files processed in the last run."
+                print "# TYPE music_library_files gauge"
+                for (f in files) printf "music_library_files{job=\"%s\",result=\"%s\"} %d\n", job, esc(f), files[f]
+            }' "$METRICS_TMP" > "$prom.tmp"
+        mv "$prom.tmp" "$prom"
+        echo "Metrics textfile saved: $prom"
+    fi
+    if [ -n "$PROFILE" ]; then
+        echo ""
+        echo "=============================================="
+        echo "PROFILE ($job, ${total}s wall)"
+        echo "=============================================="
+        echo "Slowest 10 phases:"
+        awk -F'\t' '$1 == "phase" { t[$2] += $3; c[$2]++ } END { for (p in t) printf "  %9.3fs  %7d calls  %s\n", t[p], c[p], p }' "$METRICS_TMP" | sort -rn | head -10
+        echo "Slowest 10 discs:"
+        awk -F'\t' '$1 == "disc" { t[$2] += $3 } END { for (d in t) printf "  %9.3fs  %s\n", t[d], d }' "$METRICS_TMP" | sort -rn | head -10
+        awk -F'\t' '$1 == "bytes_read" { r += $3 } $1 == "bytes_written" { w += $3 } END { printf "Bytes read: %d  written: %d\n", r, w }' "$METRICS_TMP"
+    fi
+}
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Run metrics shared by the library scripts
+
+Collects wall time per phase and per album, filesystem call counts
+(readdir/stat/open), bytes read/written (block operations where /proc is
+missing) and worker utilisation, then writes a
+Prometheus textfile for node_exporter's textfile collector and prints a
+slowest-first profile.
+
+Usage (inside a script):
+    from run_metrics import profiler
+
+    @profiler.timed("walk")
+    def find_disc_folders(path): ...
+
+    profiler.enable("validate_esoteric")
+    with profiler.album("Carmen"):
+        with profiler.phase("copy"):
+            ...
+    profiler.write_textfile("/var/lib/node_exporter/textfile_collector")
+    profiler.print_profile()
+"""
+
+import os
+import sys
+import resource
+import time
+import functools
+import threading
+from pathlib import Path
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Optional
+
+DEFAULT_TEXTFILE_DIR = "/var/lib/node_exporter/textfile_collector"
+METRIC_PREFIX = "music_library"
+
+# Per-album series are capped so a 2000-album run stays a small textfile
+ALBUM_SERIES_LIMIT = 50
+PROFILE_TOP = 10
+
+# Audit events (PEP 578) mapped to the counter they feed
+AUDIT_EVENTS = {
+    "os.scandir": "readdir",
+    "os.listdir": "readdir",
+    "open": "open",
+}
+
+
+def read_proc_io() -> Optional[dict]:
+    """Bytes read/written by this process (Linux only, None elsewhere)"""
+    try:
+        with open("/proc/self/io", "rb") as f:
+            fields = dict(line.decode().split(": ") for line in f.read().splitlines())
+        return {"read": int(fields["rchar"]), "written": int(fields["wchar"])}
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def read_rusage_io() -> dict:
+    """Block input/output operations of this process (getrusage, counts not bytes)"""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return {"read": usage.ru_inblock, "written": usage.ru_oublock}
+
+
+def escape_label(value: str) -> str:
+    """Escape a Prometheus label value"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.job = ""
+        self.started = 0.0
+        self.finished = 0.0
+        self.phase_seconds = defaultdict(float)
+        self.phase_calls = defaultdict(int)
+        self.album_seconds = {}
+        self.counters = defaultdict(int)
+        self.worker_busy = defaultdict(float)
+        self.workers = 0
+        self.io_start = None
+        self.blocks_start = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hook_installed = False
+        self._orig_stat = os.stat
+        self._orig_lstat = os.lstat
+
+    def enable(self, job: str):
+        """Start collecting for a run; cheap no-ops until this is called"""
+        self.enabled = True
+        self.job = job
+        self.started = time.perf_counter()
+        self.io_start = read_proc_io()
+        # macOS has no /proc; fall back to block counts rather than report 0 bytes
+        self.blocks_start = read_rusage_io() if self.io_start is None else None
+        if not self._hook_installed:
+            # Audit hooks cannot be removed, so the hook checks self.enabled
+            sys.addaudithook(self._audit)
+            self._hook_installed = True
+        os.stat = self._counting(self._orig_stat, "stat")
+        os.lstat = self._counting(self._orig_lstat, "stat")
+
+    def disable(self):
+        """Stop collecting and restore os.stat/os.lstat"""
+        if not self.enabled:
+            return
+        self.finished = time.perf_counter()
+        os.stat = self._orig_stat
+        os.lstat = self._orig_lstat
+        io_end = read_proc_io()
+        if self.io_start and io_end:
+            self.counters["bytes_read"] += io_end["read"] - self.io_start["read"]
+            self.counters["bytes_written"] += io_end["written"] - self.io_start["written"]
+        elif self.blocks_start:
+            blocks_end = read_rusage_io()
+            self.counters["blocks_read"] += blocks_end["read"] - self.blocks_start["read"]
+            self.counters["blocks_written"] += blocks_end["written"] - self.blocks_start["written"]
+        self.enabled = False
+
+    def _audit(self, event: str, args):
+        if not self.enabled:
+            return
+        counter = AUDIT_EVENTS.get(event)
+        if counter:
+            # Pool threads stat and scandir at the same time; += is not atomic
+            with self._lock:
+                self.counters[counter] += 1
+
+    def _counting(self, func, counter: str):
+        def wrapper(*args, **kwargs):
+            with self._lock:
+                self.counters[counter] += 1
+            return func(*args, **kwargs)
+        return wrapper
+
+    def count(self, counter: str, amount: int = 1):
+        """Add to a named counter (e.g. bytes copied by a subprocess)"""
+        if self.enabled:
+            with self._lock:
+                self.counters[counter] += amount
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a phase; nested phases are subtracted from their parent"""
+        if not self.enabled:
+            yield
+            return
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            child = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with self._lock:
+                self.phase_seconds[name] += elapsed - child
+                self.phase_calls[name] += 1
+
+    def timed(self, name: str):
+        """Decorator form of phase() for whole functions and methods"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.phase(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @contextmanager
+    def album(self, name: str):
+        """Time everything done for one album"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.album_seconds[name] = self.album_seconds.get(name, 0.0) + elapsed
+
+    def set_workers(self, workers: int):
+        """Pool size used to compute worker utilisation"""
+        self.workers = workers
+
+    @contextmanager
+    def worker(self):
+        """Mark a unit of work done by a pool worker (busy time)"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.worker_busy[threading.get_ident()] += elapsed
+
+    def add_worker_time(self, seconds: float):
+        """Add busy time measured in another process"""
+        if self.enabled:
+            with self._lock:
+                self.worker_busy[f"proc-{len(self.worker_busy)}"] += seconds
+
+    def wall_seconds(self) -> float:
+        end = self.finished if not self.enabled else time.perf_counter()
+        return max(end - self.started, 0.0)
+
+    def worker_utilisation(self) -> Optional[float]:
+        """Busy time over available worker time, None when no pool was used"""
+        if not self.workers or not self.worker_busy:
+            return None
+        available = self.wall_seconds() * self.workers
+        return min(sum(self.worker_busy.values()) / available, 1.0) if available else None
+
+    def render_textfile(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        job = escape_label(self.job)
+        p = METRIC_PREFIX
+        lines = [
+            f"# HELP {p}_run_seconds Wall time of the last run.",
+            f"# TYPE {p}_run_seconds gauge",
+            f'{p}_run_seconds{{job="{job}"}} {self.wall_seconds():.6f}',
+            f"# HELP {p}_run_timestamp_seconds Unix time the last run finished.",
+            f"# TYPE {p}_run_timestamp_seconds gauge",
+            f'{p}_run_timestamp_seconds{{job="{job}"}} {time.time():.0f}',
+            f"# HELP {p}_phase_seconds Exclusive wall time per phase in the last run.",
+            f"# TYPE {p}_phase_seconds gauge",
+        ]
+        for name, seconds in sorted(self.phase_seconds.items()):
+            lines.append(f'{p}_phase_seconds{{job="{job}",phase="{escape_label(name)}"}} {seconds:.6f}')
+        lines += [
+            f"# HELP {p}_phase_calls Number of times each phase ran in the last run.",
+            f"# TYPE {p}_phase_calls gauge",
+        ]
+        for name, calls in sorted(self.phase_calls.items()):
+            lines.append(f'{p}_phase_calls{{job="{job}",phase="{escape_label(name)}"}} {calls}')
+        lines += [
+            f"# HELP {p}_album_seconds Wall time of the {ALBUM_SERIES_LIMIT} slowest albums in the last run.",
+            f"# TYPE {p}_album_seconds gauge",
+        ]
+        for name, seconds in self.slowest_albums(ALBUM_SERIES_LIMIT):
+            lines.append(f'{p}_album_seconds{{job="{job}",album="{escape_label(name)}"}} {seconds:.6f}')
+        lines += [
+            f"# HELP {p}_fs_calls Filesystem calls (readdir, stat, open) in the last run.",
+            f"# TYPE {p}_fs_calls gauge",
+        ]
+        for call in ("readdir", "stat", "open"):
+            lines.append(f'{p}_fs_calls{{job="{job}",call="{call}"}} {self.counters[call]}')
+        # Series are omitted when unmeasured so a missing /proc never reads as 0 bytes
+        if self.has_counter("bytes_read", "bytes_written"):
+            lines += [
+                f"# HELP {p}_bytes Bytes read and written in the last run.",
+                f"# TYPE {p}_bytes gauge",
+                f'{p}_bytes{{job="{job}",direction="read"}} {self.counters["bytes_read"]}',
+                f'{p}_bytes{{job="{job}",direction="written"}} {self.counters["bytes_written"]}',
+            ]
+        if self.has_counter("blocks_read", "blocks_written"):
+            lines += [
+                f"# HELP {p}_block_ops Block input/output operations in the last run (getrusage, not bytes).",
+                f"# TYPE {p}_block_ops gauge",
+                f'{p}_block_ops{{job="{job}",direction="read"}} {self.counters["blocks_read"]}',
+                f'{p}_block_ops{{job="{job}",direction="written"}} {self.counters["blocks_written"]}',
+            ]
+        utilisation = self.worker_utilisation()
+        if utilisation is not None:
+            lines += [
+                f"# HELP {p}_worker_utilisation Busy share of worker time in the last run.",
+                f"# TYPE {p}_worker_utilisation gauge",
+                f'{p}_worker_utilisation{{job="{job}",workers="{self.workers}"}} {utilisation:.4f}',
+            ]
+        return "\n".join(lines) + "\n"
+
+    def has_counter(self, *names: str) -> bool:
+        return any(name in self.counters for name in names)
+
+    def write_textfile(self, textfile_dir: str) -> Path:
+        """Atomically write <job>.prom so node_exporter never reads half a file"""
+        out_dir = Path(textfile_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        path = out_dir / f"{self.job}.prom"
+        tmp = out_dir / f".{self.job}.prom.{os.getpid()}"
+        with open(tmp, "w") as f:
+            f.write(self.render_textfile())
+        os.replace(tmp, path)
+        print(f"Metrics textfile saved: {path}")
+        return path
+
+    def slowest_albums(self, limit: int = PROFILE_TOP) -> list:
+        return sorted(self.album_seconds.items(), key=lambda x: x[1], reverse=True)[:limit]
+
+    def slowest_phases(self, limit: int = PROFILE_TOP) -> list:
+        return sorted(self.phase_seconds.items(), key=lambda x: x[1], reverse=True)[:limit]
+
+    def print_profile(self):
+        """Print the slowest albums and phases plus I/O counters"""
+        print("\n" + "=" * 60)
+        print(f"PROFILE ({self.job}, {self.wall_seconds():.2f}s wall)")
+        print("=" * 60)
+        print(f"Slowest {PROFILE_TOP} phases:")
+        for name, seconds in self.slowest_phases():
+            print(f"  {seconds:9.3f}s  {self.phase_calls[name]:7d} calls  {name}")
+        if self.album_seconds:
+            print(f"Slowest {PROFILE_TOP} albums:")
+            for name, seconds in self.slowest_albums():
+                print(f"  {seconds:9.3f}s  {name}")
+        c = self.counters
+        print(f"readdir: {c['readdir']}  stat: {c['stat']}  open: {c['open']}")
+        if self.has_counter("bytes_read", "bytes_written"):
+            print(f"Bytes read: {c['bytes_read']}  written: {c['bytes_written']}")
+        if self.has_counter("blocks_read", "blocks_written"):
+            print(f"Block ops read: {c['blocks_read']}  written: {c['blocks_written']}")
+        utilisation = self.worker_utilisation()
+        if utilisation is not None:
+            print(f"Worker utilisation: {utilisation:.1%} of {self.workers} workers")
+
+
+# Shared instance used by all scripts in this folder
+profiler = Profiler()
@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+Library Junk and Orphan Sweeper
+
+Walks the NAS once with parallel os.scandir workers and removes what a
+declarative policy marks as junk: AppleDouble ._* files, .DS_Store, stale
+/tmp/cue_batch_temp leftovers, broken symlinks and directories left empty
+(e.g. after validate-esoteric.py flattens nested folders). Deletions are
+batched per directory and a dry-run/applied report is written.
+
+Policy (JSON, see --write-default-policy):
+    roots      - directories to walk
+    protected  - path globs that are never touched or descended into
+    keep       - path globs that are still swept but never removed as empty dirs
+    rules      - evaluated in order, the first rule whose patterns match wins:
+        kind           file | dir | broken_symlink | empty_dir
+        patterns       name globs (default: any name)
+        under          only apply below these path prefixes
+        min_depth      empty_dir only: levels below the `under` prefix (1 = its children)
+        min_age_hours  only entries not modified for this long
+
+Usage:
+    python sweep-library-junk.py                         # Dry-run with default policy
+    python sweep-library-junk.py --apply                 # Delete
+    python sweep-library-junk.py --root /mnt/nas/music/exyu --apply
+    python sweep-library-junk.py --policy sweep-policy.json --workers 16
+    python sweep-library-junk.py --write-default-policy sweep-policy.json
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import fnmatch
+import argparse
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional
+
+from run_metrics import profiler, DEFAULT_TEXTFILE_DIR
+
+DEFAULT_WORKERS = 8
+DEFAULT_BATCH_SIZE = 256
+RULE_KINDS = {"file", "dir", "broken_symlink", "empty_dir"}
+
+DEFAULT_POLICY = {
+    "roots": ["/mnt/nas", "/tmp/cue_batch_temp"],
+    "protected": [
+        "/mnt/nas/lost+found",
+        "/mnt/nas/CD_RIP",
+        "*/.snapshots",
+        "*/.Trash-*",
+        "*/.Spotlight-V100",
+        "*/.fseventsd",
+    ],
+    # Genre roots stay even when empty (jazz/ is kept for the future)
+    "keep": [
+        "/mnt/nas/music",
+        "/mnt/nas/music/metal",
+        "/mnt/nas/music/exyu",
+        "/mnt/nas/music/classical",
+        "/mnt/nas/music/classical/esoteric-flac",
+        "/mnt/nas/music/jazz",
+        "/mnt/nas/esoteric",
+    ],
+    "rules": [
+        {"name": "cue_batch_temp", "kind": "file", "under": ["/tmp/cue_batch_temp"], "min_age_hours": 24},
+        {"name": "appledouble", "kind": "file", "patterns": ["._*"]},
+        {"name": "ds_store", "kind": "file", "patterns": [".DS_Store"]},
+        {"name": "windows_metadata", "kind": "file", "patterns": ["Thumbs.db", "desktop.ini"]},
+        {"name": "appledouble_dir", "kind": "dir", "patterns": [".AppleDouble", "__MACOSX"]},
+        {"name": "broken_symlink", "kind": "broken_symlink"},
+        # Album and disc folders emptied by validate-esoteric.py --fix or by junk removal;
+        # music/<genre>/<artist>/<album> is depth 3, esoteric/<album>/<disc> is depth 2
+        {"name": "empty_dir", "kind": "empty_dir", "under": ["/mnt/nas/music"], "min_depth": 3,
+         "min_age_hours": 1},
+        {"name": "empty_esoteric_dir", "kind": "empty_dir", "under": ["/mnt/nas/esoteric"], "min_depth": 2,
+         "min_age_hours": 1},
+    ],
+}
+
+
+def format_size(num_bytes: int) -> str:
+    """Human readable size (GiB/MiB/KiB)"""
+    if num_bytes >= 1024 ** 3:
+        return f"{num_bytes / 1024 ** 3:.2f} GiB"
+    if num_bytes >= 1024 ** 2:
+        return f"{num_bytes / 1024 ** 2:.1f} MiB"
+    return f"{num_bytes / 1024:.1f} KiB"
+
+
+def compile_globs(globs: list) -> Optional[re.Pattern]:
+    """Compile several fnmatch globs into one regex"""
+    if not globs:
+        return None
+    return re.compile("|".join(f"(?:{fnmatch.translate(g)})" for g in globs))
+
+
+def tree_size(path: str) -> int:
+    """Apparent size of a directory tree (junk dirs are small)"""
+    total = 0
+    for folder, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(folder, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class JunkSweeper:
+    def __init__(self, policy: dict, dry_run: bool = True, workers: int = DEFAULT_WORKERS,
+                 batch_size: int = DEFAULT_BATCH_SIZE):
+        self.policy = policy
+        self.roots = [os.path.abspath(r) for r in policy["roots"]]
+        self.dry_run = dry_run
+        self.workers = workers
+        self.batch_size = batch_size
+        self.now = time.time()
+
+        self.rules = []
+        for rule in policy["rules"]:
+            if rule.get("kind") not in RULE_KINDS:
+                raise ValueError(f"Unknown rule kind in {rule.get('name')}: {rule.get('kind')}")
+            self.rules.append({
+                "name": rule["name"],
+                "kind": rule["kind"],
+                "patterns": rule.get("patterns", ["*"]),
+                "under": [os.path.abspath(u) for u in rule.get("under", [])],
+                "min_age": rule.get("min_age_hours", 0) * 3600,
+                "min_depth": rule.get("min_depth", 1),
+            })
+        self.protected = compile_globs(policy.get("protected", []))
+        self.keep = compile_globs(policy.get("keep", []))
+        self._matchers = {}
+
+        # Directory bookkeeping for the empty-dir pass: path -> info
+        self.dirs = {}
+        self.candidates = []
+
+        self.report = {
+            "generated": datetime.now().isoformat(),
+            "roots": self.roots,
+            "dry_run": dry_run,
+            "policy": policy,
+            "removed": [],
+            "errors": [],
+            "rules": {r["name"]: {"count": 0, "bytes": 0} for r in self.rules},
+            "summary": {
+                "dirs_scanned": 0,
+                "entries_scanned": 0,
+                "items_removed": 0,
+                "bytes_removed": 0,
+                "errors": 0,
+                "scan_seconds": 0.0,
+                "delete_seconds": 0.0,
+            }
+        }
+
+    def is_protected(self, path: str) -> bool:
+        return bool(self.protected and self.protected.match(path))
+
+    def matchers_for(self, folder: str) -> dict:
+        """Combined name matcher per rule kind for the rules that apply in this folder (cached)"""
+        active = tuple(i for i, r in enumerate(self.rules)
+                       if r["kind"] != "empty_dir"
+                       and (not r["under"] or any(folder == u or folder.startswith(u + os.sep) for u in r["under"])))
+        matchers = self._matchers.get(active)
+        if matchers is None:
+            parts = {}
+            for i in active:
+                rule = self.rules[i]
+                kind_parts = parts.setdefault(rule["kind"], [])
+                for pattern in rule["patterns"]:
+                    kind_parts.append(f"(?P<r{i}_{len(kind_parts)}>{fnmatch.translate(pattern)})")
+            # Alternation tries rules in policy order, so the first matching rule wins
+            matchers = {kind: re.compile("|".join(p)) for kind, p in parts.items()}
+            self._matchers[active] = matchers
+        return matchers
+
+    def match_rule(self, matchers: dict, name: str, kind: str) -> Optional[dict]:
+        """First rule of this kind whose pattern matches the entry name"""
+        matcher = matchers.get(kind)
+        if matcher is None:
+            return None
+        m = matcher.match(name)
+        if m is None:
+            return None
+        return self.rules[int(m.lastgroup[1:].split("_")[0])]
+
+    def old_enough(self, rule: dict, mtime: float) -> bool:
+        return not rule["min_age"] or self.now - mtime >= rule["min_age"]
+
+    @profiler.timed("scan")
+    def scan_dir(self, folder: str) -> dict:
+        """Scan one directory (runs in a worker thread)"""
+        with profiler.worker():
+            result = {"folder": folder, "subdirs": [], "junk": [], "entries": 0, "mtime": 0.0, "error": None}
+            matchers = self.matchers_for(folder)
+            try:
+                result["mtime"] = os.lstat(folder).st_mtime
+                with os.scandir(folder) as it:
+                    for entry in it:
+                        result["entries"] += 1
+                        path = entry.path
+                        if self.is_protected(path):
+                            continue
+                        try:
+                            if entry.is_symlink():
+                                if not os.path.exists(path):
+                                    rule = self.match_rule(matchers, entry.name, "broken_symlink")
+                                    if rule and self.old_enough(rule, entry.stat(follow_symlinks=False).st_mtime):
+                                        result["junk"].append((entry.name, rule, 0))
+                            elif entry.is_dir(follow_symlinks=False):
+                                rule = self.match_rule(matchers, entry.name, "dir")
+                                if rule and self.old_enough(rule, entry.stat(follow_symlinks=False).st_mtime):
+                                    result["junk"].append((entry.name, rule, tree_size(path)))
+                                else:
+                                    result["subdirs"].append(path)
+                            else:
+                                rule = self.match_rule(matchers, entry.name, "file")
+                                if rule:
+                                    st = entry.stat(follow_symlinks=False)
+                                    if self.old_enough(rule, st.st_mtime):
+                                        result["junk"].append((entry.name, rule, st.st_size))
+                        except OSError as e:
+                            result.setdefault("entry_errors", []).append(f"{path}: {e}")
+            except OSError as e:
+                result["error"] = str(e)
+            return result
+
+    def walk(self):
+        """Walk all roots with a pool of scandir workers"""
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = set()
+            for root in self.roots:
+                if not os.path.isdir(root):
+                    print(f"[SKIP] Root does not exist: {root}")
+                    continue
+                self.dirs[root] = {"parent": None, "depth": 0, "entries": 0, "removed": 0, "mtime": 0.0}
+                pending.add(pool.submit(self.scan_dir, root))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    folder = result["folder"]
+                    info = self.dirs[folder]
+                    self.report["summary"]["dirs_scanned"] += 1
+                    self.report["summary"]["entries_scanned"] += result["entries"]
+                    if result["error"]:
+                        self.record_error(folder, result["error"])
+                        info["entries"] = -1  # unknown contents, never treat as empty
+                        continue
+                    for message in result.get("entry_errors", []):
+                        self.record_error(folder, message)
+                    info["entries"] = result["entries"]
+                    info["mtime"] = result["mtime"]
+                    for name, rule, size in result["junk"]:
+                        self.candidates.append((folder, name, rule, size))
+                        info["removed"] += 1
+                    for sub in result["subdirs"]:
+                        self.dirs[sub] = {"parent": folder, "depth": info["depth"] + 1,
+                                          "entries": 0, "removed": 0, "mtime": 0.0}
+                        pending.add(pool.submit(self.scan_dir, sub))
+        self.report["summary"]["scan_seconds"] = round(time.perf_counter() - start, 3)
+
+    def empty_dir_rule(self, folder: str) -> Optional[dict]:
+        for rule in self.rules:
+            if rule["kind"] != "empty_dir":
+                continue
+            if not rule["under"]:
+                return rule
+            for u in rule["under"]:
+                if folder.startswith(u + os.sep) and folder[len(u) + 1:].count(os.sep) + 1 >= rule["min_depth"]:
+                    return rule
+        return None
+
+    def find_empty_dirs(self) -> list:
+        """Dirs that are empty once their junk is gone (deepest first, roots never)"""
+        empty = []
+        for folder in sorted(self.dirs, key=lambda d: self.dirs[d]["depth"], reverse=True):
+            info = self.dirs[folder]
+            if info["parent"] is None or info["entries"] < 0 or info["entries"] - info["removed"] > 0:
+                continue
+            if self.is_protected(folder) or (self.keep and self.keep.match(folder)):
+                continue
+            rule = self.empty_dir_rule(folder)
+            if rule is None or not self.old_enough(rule, info["mtime"]):
+                continue
+            empty.append((folder, rule))
+            # The parent loses one entry once this dir is removed
+            self.dirs[info["parent"]]["removed"] += 1
+        return empty
+
+    def record_error(self, path: str, message: str):
+        self.report["errors"].append({"path": path, "error": message})
+        self.report["summary"]["errors"] += 1
+
+    def record_removed(self, path: str, rule: dict, size: int):
+        self.report["removed"].append({"path": path, "rule": rule["name"], "bytes": size})
+        self.report["rules"][rule["name"]]["count"] += 1
+        self.report["rules"][rule["name"]]["bytes"] += size
+        self.report["summary"]["items_removed"] += 1
+        self.report["summary"]["bytes_removed"] += size
+
+    @profiler.timed("delete")
+    def delete_batch(self, folder: str, batch: list) -> list:
+        """Remove one batch of entries from a single directory"""
+        with profiler.worker():
+            removed = []
+            dir_fd = None
+            if os.unlink in os.supports_dir_fd:
+                try:
+                    dir_fd = os.open(folder, os.O_RDONLY)
+                except OSError:
+                    dir_fd = None
+            try:
+                for name, rule, size in batch:
+                    path = os.path.join(folder, name)
+                    try:
+                        if rule["kind"] == "dir":
+                            shutil.rmtree(path)
+                        elif dir_fd is not None:
+                            # Relative unlink skips resolving the full path every time
+                            os.unlink(name, dir_fd=dir_fd)
+                        else:
+                            os.unlink(path)
+                        removed.append((path, rule, size, None))
+                    except OSError as e:
+                        removed.append((path, rule, size, str(e)))
+            finally:
+                if dir_fd is not None:
+                    os.close(dir_fd)
+            return removed
+
+    def delete(self, empty_dirs: list):
+        """Batched parallel deletes, then empty dirs deepest first"""
+        start = time.perf_counter()
+        by_folder = {}
+        for folder, name, rule, size in self.candidates:
+            by_folder.setdefault(folder, []).append((name, rule, size))
+
+        if self.dry_run:
+            for folder, items in by_folder.items():
+                for name, rule, size in items:
+                    self.record_removed(os.path.join(folder, name), rule, size)
+            for folder, rule in empty_dirs:
+                self.record_removed(folder, rule, 0)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = []
+            for folder, items in by_folder.items():
+                for i in range(0, len(items), self.batch_size):
+                    futures.append(pool.submit(self.delete_batch, folder, items[i:i + self.batch_size]))
+            for future in futures:
+                for path, rule, size, error in future.result():
+                    if error:
+                        self.record_error(path, error)
+                    else:
+                        self.record_removed(path, rule, size)
+
+        for folder, rule in empty_dirs:
+            try:
+                # rmdir refuses non-empty dirs, so anything written since the scan is safe
+                os.rmdir(folder)
+                self.record_removed(folder, rule, 0)
+            except OSError as e:
+                self.record_error(folder, str(e))
+        self.report["summary"]["delete_seconds"] = round(time.perf_counter() - start, 3)
+
+    def run(self):
+        """Scan, plan and (optionally) delete"""
+        print(f"Roots: {', '.join(self.roots)}")
+        print(f"Workers: {self.workers}")
+        print(f"Mode: {'DRY-RUN' if self.dry_run else 'DELETING'}")
+        print("=" * 60)
+        profiler.set_workers(self.workers)
+        self.walk()
+        with profiler.phase("plan"):
+            empty_dirs = self.find_empty_dirs()
+        self.delete(empty_dirs)
+        self.print_summary()
+
+    def print_summary(self):
+        """Print per-rule totals"""
+        print("\n" + "=" * 60)
+        print("SUMMARY")
+        print("=" * 60)
+        verb = "Would remove" if self.dry_run else "Removed"
+        for name, stats in self.report["rules"].items():
+            print(f"{name + ':':22} {stats['count']:8d}  {format_size(stats['bytes'])}")
+        s = self.report["summary"]
+        print(f"\nDirs scanned:          {s['dirs_scanned']}")
+        print(f"Entries scanned:       {s['entries_scanned']}")
+        print(f"{verb}:{' ' * (22 - len(verb))}{s['items_removed']} ({format_size(s['bytes_removed'])})")
+        print(f"Errors:                {s['errors']}")
+        print(f"Scan time:             {s['scan_seconds']}s")
+
+    def save_report(self, output_dir: Path):
+        """Save report to JSON and text files"""
+        json_path = output_dir / "junk-sweep-report.json"
+        with open(json_path, "w") as f:
+            json.dump(self.report, f, indent=2, ensure_ascii=False)
+        print(f"\nJSON report saved: {json_path}")
+
+        txt_path = output_dir / "junk-sweep-report.txt"
+        with open(txt_path, "w") as f:
+            f.write("# Library Junk Sweep Report\n")
+            f.write(f"# Generated: {self.report['generated']}\n")
+            f.write(f"# Mode: {'DRY-RUN' if self.dry_run else 'APPLIED'}\n")
+            f.write("=" * 60 + "\n\n")
+
+            for name, stats in self.report["rules"].items():
+                items = [r for r in self.report["removed"] if r["rule"] == name]
+                if not items:
+                    continue
+                f.write(f"## {name.upper()} ({stats['count']}, {format_size(stats['bytes'])})\n\n")
+                for item in items:
+                    f.write(f"{item['path']}\n")
+                f.write("\n")
+
+            if self.report["errors"]:
+                f.write("## ERRORS\n\n")
+                for item in self.report["errors"]:
+                    f.write(f"{item['path']}: {item['error']}\n")
+                f.write("\n")
+
+            f.write("## SUMMARY\n\n")
+            for key, value in self.report["summary"].items():
+                f.write(f"{key}: {value}\n")
+        print(f"Text report saved: {txt_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove junk files, broken symlinks and empty dirs from the library")
+    parser.add_argument("--policy", type=str, help="Policy JSON file (default: built-in policy)")
+    parser.add_argument("--write-default-policy", type=str, metavar="FILE", help="Write the built-in policy and exit")
+    parser.add_argument("--root", action="append", help="Override policy roots (repeatable)")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would be done")
+    parser.add_argument("--apply", action="store_true", help="Delete (default is dry-run)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help=f"scandir workers. Default: {DEFAULT_WORKERS}")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Deletes per batch. Default: {DEFAULT_BATCH_SIZE}")
+    parser.add_argument("--report-dir", type=str, default=".", help="Directory to save reports")
+    parser.add_argument("--profile", action="store_true", help="Print the slowest phases")
+    parser.add_argument("--metrics-dir", type=str, nargs="?", const=DEFAULT_TEXTFILE_DIR,
+                        help=f"Write Prometheus textfile for node_exporter. Default dir: {DEFAULT_TEXTFILE_DIR}")
+
+    args = parser.parse_args()
+    if args.write_default_policy:
+        with open(args.write_default_policy, "w") as f:
+            json.dump(DEFAULT_POLICY, f, indent=2)
+        print(f"Default policy written: {args.write_default_policy}")
+        return
+
+    policy = DEFAULT_POLICY
+    if args.policy:
+        with open(args.policy) as f:
+            policy = json.load(f)
+    if args.root:
+        policy = dict(policy, roots=args.root)
+
+    if args.profile or args.metrics_dir:
+        profiler.enable("sweep_library_junk")
+    sweeper = JunkSweeper(policy=policy, dry_run=not args.apply, workers=args.workers, batch_size=args.batch_size)
+    sweeper.run()
+    sweeper.save_report(Path(args.report_dir))
+    profiler.disable()
+    if args.metrics_dir:
+        profiler.write_textfile(args.metrics_dir)
+    if args.profile:
+        profiler.print_profile()
+
+
+if __name__ == "__main__":
+    main()
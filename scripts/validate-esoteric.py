@@ -9,6 +9,7 @@ Usage:
     python validate-esoteric.py --dry-run          # Show what would be done
     python validate-esoteric.py --fix              # Execute fixes
     python validate-esoteric.py --album "Carmen"   # Check specific album
+    python validate-esoteric.py --profile          # Print slowest albums/phases
 """
 
 import os
@@ -20,6 +21,8 @@ from pathlib import Path
 from datetime import datetime
 from typing import Optional
 
+from run_metrics import profiler, DEFAULT_TEXTFILE_DIR
+
 # Default paths - can be overridden via CLI
 DEFAULT_SOURCE = "/Volumes/Expansion/00_DSD/00_esoteric"
 DEFAULT_TARGET = "/Volumes/Untitled/esoteric"
@@ -54,32 +57,37 @@ class EsotericValidator:
     def get_expected_disc_count(self, folder_name: str, source_path: Path = None) -> int:
         """Parse disc count from source folder name or count source disc folders"""
         # First try to get count from folder name pattern
-        match = re.search(r'\(Esoteric,\s*(\d+)?x?(SACD|DSD)\)', folder_name)
+        with profiler.phase("regex"):
+            match = re.search(r'\(Esoteric,\s*(\d+)?x?(SACD|DSD)\)', folder_name)
         if match:
             count = match.group(1)
             if count:
                 return int(count)
         
         # If no count in name and source path provided, count disc folders or ISOs
-        if source_path and source_path.exists():
-            disc_folders = self.find_disc_folders(source_path)
-            if disc_folders:
-                return len(disc_folders)
-            # Count ISO files
-            isos = list(source_path.glob("*.iso"))
-            if isos:
-                return len(isos)
+        with profiler.phase("walk"):
+            if source_path and source_path.exists():
+                disc_folders = self.find_disc_folders(source_path)
+                if disc_folders:
+                    return len(disc_folders)
+                # Count ISO files
+                isos = list(source_path.glob("*.iso"))
+                if isos:
+                    return len(isos)
         
         return 1
     
+    @profiler.timed("regex")
     def is_dsd_album(self, folder_name: str) -> bool:
         """Check if album is original DSD (not extracted from SACD)"""
         return bool(re.search(r'\(Esoteric,\s*[\d]*DSD\)', folder_name))
     
+    @profiler.timed("regex")
     def get_target_folder_name(self, source_name: str) -> str:
         """Convert source folder name to expected target folder name"""
         return re.sub(r'\(Esoteric,\s*\d*x?SACD\)', '(Esoteric, DSDe)', source_name)
     
+    @profiler.timed("walk")
     def find_disc_folders(self, album_path: Path) -> list:
         """Find all disc folders in an album"""
         disc_folders = []
@@ -115,6 +123,7 @@ class EsotericValidator:
         
         return sorted(disc_folders, key=lambda x: x["disc_num"])
     
+    @profiler.timed("walk")
     def find_nested_extraction_folder(self, disc_path: Path) -> Optional[Path]:
         """Find nested folder created by sacd_extract inside disc folder"""
         if not disc_path.exists():
@@ -127,6 +136,7 @@ class EsotericValidator:
                 return subdir
         return None
     
+    @profiler.timed("walk")
     def find_symlinks(self, path: Path) -> list:
         """Find all symlinks recursively in path"""
         symlinks = []
@@ -137,6 +147,7 @@ class EsotericValidator:
                 symlinks.append(item)
         return symlinks
     
+    @profiler.timed("walk")
     def find_cover_in_source(self, source_album: Path) -> Optional[Path]:
         """Find cover image in source album folder"""
         for name in ["cover.jpg", "folder.jpg", "Cover.jpg", "Folder.jpg"]:
@@ -151,6 +162,7 @@ class EsotericValidator:
                     return cover
         return None
     
+    @profiler.timed("fix")
     def flatten_nested_folder(self, disc_path: Path, nested_path: Path) -> bool:
         """Move files from nested folder up to disc folder"""
         if self.dry_run:
@@ -170,6 +182,7 @@ class EsotericValidator:
             print(f"  [ERROR] Failed to flatten {nested_path}: {e}")
             return False
     
+    @profiler.timed("fix")
     def rename_disc_folder(self, old_path: Path, new_name: str) -> bool:
         """Rename disc folder to standardized name"""
         new_path = old_path.parent / new_name
@@ -187,6 +200,7 @@ class EsotericValidator:
             print(f"  [ERROR] Failed to rename {old_path}: {e}")
             return False
     
+    @profiler.timed("fix")
     def remove_symlink(self, symlink_path: Path) -> bool:
         """Remove a symlink"""
         if self.dry_run:
@@ -201,6 +215,7 @@ class EsotericValidator:
             print(f"  [ERROR] Failed to remove symlink {symlink_path}: {e}")
             return False
     
+    @profiler.timed("copy")
     def copy_cover(self, source_cover: Path, target_album: Path) -> bool:
         """Copy cover art to target album"""
         target_cover = target_album / "cover.jpg"
@@ -222,7 +237,12 @@ class EsotericValidator:
         source_name = source_album.name
         if filter_name and filter_name.lower() not in source_name.lower():
             return
-        
+        with profiler.album(source_name):
+            self.validate_album(source_album)
+    
+    def validate_album(self, source_album: Path):
+        """Validate one top-level album (single album or box set)"""
+        source_name = source_album.name
         self.report["summary"]["albums_scanned"] += 1
         
         if self.is_dsd_album(source_name):
@@ -255,6 +275,7 @@ class EsotericValidator:
         
         self.process_single_album(source_album, target_album, expected_discs)
     
+    @profiler.timed("walk")
     def find_sub_albums(self, source_album: Path, target_album: Path) -> list:
         """Find sub-albums in box sets"""
         sub_albums = []
@@ -296,6 +317,7 @@ class EsotericValidator:
             return
         self.process_single_album(source_sub, target_sub, expected_discs, indent="    ")
     
+    @profiler.timed("walk")
     def find_extraction_wrapper_folder(self, album_path: Path) -> Optional[Path]:
         """Find extraction wrapper folder (e.g., 'Wagner_ Das Rheingold/') that contains disc folders"""
         if not album_path.exists():
@@ -454,6 +476,7 @@ class EsotericValidator:
         print(f"Symlinks removed:      {s['symlinks_removed']}")
         print(f"Covers copied:         {s['covers_copied']}")
     
+    @profiler.timed("report")
     def save_report(self, output_dir: Path):
         """Save report to JSON and text files"""
         json_path = output_dir / "esoteric-sync-report.json"
@@ -508,13 +531,23 @@ def main():
     parser.add_argument("--fix", action="store_true", help="Apply fixes (default is dry-run)")
     parser.add_argument("--album", type=str, help="Filter to specific album name (partial match)")
     parser.add_argument("--report-dir", type=str, default=".", help="Directory to save reports")
+    parser.add_argument("--profile", action="store_true", help="Print the slowest albums and phases")
+    parser.add_argument("--metrics-dir", type=str, nargs="?", const=DEFAULT_TEXTFILE_DIR,
+                        help=f"Write Prometheus textfile for node_exporter. Default dir: {DEFAULT_TEXTFILE_DIR}")
     
     args = parser.parse_args()
     dry_run = not args.fix
     
+    if args.profile or args.metrics_dir:
+        profiler.enable("validate_esoteric")
     validator = EsotericValidator(source_path=args.source, target_path=args.target, dry_run=dry_run)
     validator.run(filter_album=args.album)
     validator.save_report(Path(args.report_dir))
+    profiler.disable()
+    if args.metrics_dir:
+        profiler.write_textfile(args.metrics_dir)
+    if args.profile:
+        profiler.print_profile()
 
 
 if __name__ == "__main__":